@@ -1,20 +1,61 @@
 import json
 
 import pytest
-import requests
 from requests_toolbelt.multipart.encoder import MultipartEncoder
 
+from compression import TransferStats, accept_encoding
+from journal import default_journal
+from settings import base_url as default_base_url
+from streaming import StreamingForm, StreamingMultipart, is_streamable
+from transport import shared_transport
+
+# Значение journal по умолчанию: общий журнал процесса (None означает "журнал не вести")
+DEFAULT_JOURNAL = object()
+
+
 class PetFriends:
     """API библиотека к веб приложению Pet Friends"""
 
-    def __init__(self):
-        self.base_url = 'https://petfriends1.herokuapp.com/'
+    def __init__(self, base_url: str = default_base_url, transport=None, journal=DEFAULT_JOURNAL):
+        """transport - объект с методом request(method, url, headers, params, data), через который
+        выполняются все запросы (см. transport.py). По умолчанию - общий на процесс shared_transport().
+        В transfer_stats копятся размеры ответов со списком питомцев - сжатые и распакованные.
+        journal - журнал созданных питомцев (journal.PetJournal) для последующей уборки. По умолчанию -
+        общий журнал процесса при любом транспорте; None - журнал не ведётся (клиенты на PetFriendsStub
+        и локальных серверах в тестах, которые не создают питомцев на настоящем бэкенде)"""
+        self.base_url = base_url
+        self.transport = transport or shared_transport()
+        self.transfer_stats = TransferStats()
+        self.journal = default_journal() if journal is DEFAULT_JOURNAL else journal
+        self.last_upload = None
+
+    def _journal_created(self, auth_key: json, status: int, result):
+        """Записывает созданного питомца в журнал, чтобы его можно было удалить после тестов"""
+        if self.journal is not None and status == 200 and isinstance(result, dict) and 'id' in result:
+            self.journal.created(result['id'], auth_key['key'], self.base_url)
+
+    def _send(self, method: str, url: str, headers: dict, data):
+        """Отправляет запрос с телом data. Для потокового тела (streaming.py) статистика отправки
+        сохраняется в self.last_upload, в том числе когда сервер обрывает соединение до конца загрузки"""
+        stats = getattr(data, 'stats', None)
+        if stats is not None:
+            self.last_upload = stats
+        try:
+            res = self.transport.request(method, url, headers=headers, data=data)
+        except Exception as e:
+            if stats is not None:
+                stats.abort(f'{type(e).__name__}: {e}')
+            raise
+        if stats is not None and stats.finished is None:
+            # Сервер ответил, не дочитав тело (например 413), и транспорт прекратил отправку
+            stats.abort(f'ответ {res.status_code} до окончания отправки тела')
+        return res
 
     def get_api_key(self, email: str, passwd: str) -> json:
         """Метод делает запрос к API сервера и возвращает статус запроса и результат в формате
         JSON с уникальным ключем пользователя, найденного по указанным email и паролем"""
         headers = {'email': email, 'password': passwd}
-        res = requests.get(self.base_url+'api/key', headers=headers)
+        res = self.transport.request('GET', self.base_url+'api/key', headers=headers)
         status = res.status_code
         result = ''
         try:
@@ -27,12 +68,15 @@ class PetFriends:
         """Метод делает запрос к API сервера и возвращает статус запроса и результат в формате JSON
         со списком наденных питомцев, совпадающих с фильтром. На данный момент фильтр может иметь
         либо пустое значение - получить список всех питомцев, либо 'my_pets' - получить список
-        собственных питомцев"""
+        собственных питомцев. Ответ запрашивается в сжатом виде (Accept-Encoding), размеры
+        ответа до и после распаковки записываются в self.transfer_stats"""
 
-        headers = {'auth_key': auth_key['key']}
+        headers = {'auth_key': auth_key['key'], 'Accept-Encoding': accept_encoding()}
         filter = {'filter': filter}
 
-        res = requests.get(self.base_url + 'api/pets', headers=headers, params=filter)
+        res = self.transport.request('GET', self.base_url + 'api/pets', headers=headers, params=filter)
+        self.transfer_stats.record('api/pets', getattr(res, 'wire_size', len(res.content)), len(res.content),
+                                   res.headers.get('Content-Encoding', ''))
         status = res.status_code
         result = ''
         try:
@@ -45,13 +89,15 @@ class PetFriends:
         """Метод отправляет (постит) на сервер данные о добавляемом питомце и возвращает статус
         запроса на сервер и результат в формате JSON с данными добавленного питомца"""
 
-        data = MultipartEncoder(fields = {'name': name,
-                                          'animal_type': animal_type,
-                                          'age': age,
-                                          'pet_photo': (pet_photo, open(pet_photo, 'rb'), 'image/jpeg')})
-        headers = {'auth_key': auth_key['key'], 'Content-Type': data.content_type}
+        # Файл фото закрываем сразу после отправки, чтобы не копить открытые дескрипторы
+        with open(pet_photo, 'rb') as photo:
+            data = MultipartEncoder(fields = {'name': name,
+                                              'animal_type': animal_type,
+                                              'age': age,
+                                              'pet_photo': (pet_photo, photo, 'image/jpeg')})
+            headers = {'auth_key': auth_key['key'], 'Content-Type': data.content_type}
 
-        res = requests.post(self.base_url+'api/pets', headers=headers, data=data)
+            res = self.transport.request('POST', self.base_url+'api/pets', headers=headers, data=data)
         status = res.status_code
         result = ''
         try:
@@ -59,6 +105,7 @@ class PetFriends:
         except json.decoder.JSONDecodeError:
             result = res.text
             print(result)
+        self._journal_created(auth_key, status, result)
         return status, result
 
     def delete_pet(self, auth_key: json, pet_id: str) -> json:
@@ -68,23 +115,30 @@ class PetFriends:
 
         headers = {'auth_key': auth_key['key']}
 
-        res = requests.delete(self.base_url + 'api/pets/' + pet_id, headers=headers)
+        res = self.transport.request('DELETE', self.base_url + 'api/pets/' + pet_id, headers=headers)
         status = res.status_code
         result = ""
         try:
             result = res.json()
         except json.decoder.JSONDecodeError:
             result = res.text
+        if self.journal is not None and status == 200:
+            self.journal.deleted(pet_id)
         return status, result
 
     def update_pet_info(self, auth_key: json, pet_id: str, name: str, animal_type: str, age: int) -> json:
         """Метод отправляет запрос на сервер о обновлении данных питомуа по указанному ID и
-        возвращает статус запроса и result в формате JSON с обновлённыи данными питомца"""
+        возвращает статус запроса и result в формате JSON с обновлённыи данными питомца.
+        Значения полей могут быть файлами или генераторами блоков любого размера - тогда тело
+        отправляется потоком (chunked), а статистика отправки сохраняется в self.last_upload"""
 
         headers = {'auth_key': auth_key['key']}
         data = {'name': name, 'age': age, 'animal_type': animal_type}
+        if any(is_streamable(value) for value in data.values()):
+            data = StreamingForm(data)
+            headers['Content-Type'] = data.content_type
 
-        res = requests.put(self.base_url + 'api/pets/' + pet_id, headers=headers, data=data)
+        res = self._send('PUT', self.base_url + 'api/pets/' + pet_id, headers, data)
         status = res.status_code
         result = ""
         try:
@@ -98,7 +152,7 @@ class PetFriends:
         запроса на сервер и результат в формате JSON с данными добавленного питомца"""
         data = {'name': name, 'animal_type': animal_type, 'age': age}
         headers = {'auth_key': auth_key['key']}
-        res = requests.post(self.base_url + 'api/create_pet_simple', headers=headers, data=data)
+        res = self.transport.request('POST', self.base_url + 'api/create_pet_simple', headers=headers, data=data)
         status = res.status_code
         result = ''
         try:
@@ -106,14 +160,17 @@ class PetFriends:
         except json.decoder.JSONDecodeError:
             result = res.text
             print(result)
+        self._journal_created(auth_key, status, result)
         return status, result
 
     def post_add_photo_pet(self, auth_key: json, pet_id: str, pet_photo: str):
         """Метод отправляет на сервер фото питомца по указанному ID и возвращает статус
         запроса на сервер и результат в формате JSON с данными питомца"""
-        data = MultipartEncoder(fields={'pet_photo': (pet_photo, open(pet_photo, 'rb'), 'image/jpg')})
-        headers = {'auth_key': auth_key['key'], 'Content-Type': data.content_type}
-        res = requests.post(self.base_url + f'api/pets/set_photo/{pet_id}', headers=headers, data=data)
+        with open(pet_photo, 'rb') as photo:
+            data = MultipartEncoder(fields={'pet_photo': (pet_photo, photo, 'image/jpg')})
+            headers = {'auth_key': auth_key['key'], 'Content-Type': data.content_type}
+            res = self.transport.request('POST', self.base_url + f'api/pets/set_photo/{pet_id}', headers=headers,
+                                         data=data)
         status = res.status_code
         result = ''
         try:
@@ -125,10 +182,16 @@ class PetFriends:
 
     def add_new_pet_simple(self, auth_key: json, name: str, animal_type: str, age: str) -> json:
         """Метод отправляет на сервер данные о добавляемом питомце и возвращает статус
-        запроса и результат в формате JSON с данными добавленного питомца"""
-        data = MultipartEncoder(fields={'name': name, 'animal_type': animal_type, 'age': age})
+        запроса и результат в формате JSON с данными добавленного питомца. Значения полей могут быть
+        файлами или генераторами блоков любого размера - тогда тело отправляется потоком (chunked),
+        а статистика отправки сохраняется в self.last_upload"""
+        fields = {'name': name, 'animal_type': animal_type, 'age': age}
+        if any(is_streamable(value) for value in fields.values()):
+            data = StreamingMultipart(fields)
+        else:
+            data = MultipartEncoder(fields=fields)
         headers = {'auth_key': auth_key['key'], 'Content-Type': data.content_type}
-        res = requests.post(self.base_url + 'api/create_pet_simple', headers=headers, data=data)
+        res = self._send('POST', self.base_url + 'api/create_pet_simple', headers, data)
         status = res.status_code
         result = ""
         try:
@@ -136,4 +199,5 @@ class PetFriends:
         except json.decoder.JSONDecodeError:
             result = res.text
         print(result)
+        self._journal_created(auth_key, status, result)
         return status, result
@@ -0,0 +1,142 @@
+import threading
+import zlib
+
+# brotli и zstd поддерживаются только при наличии соответствующих библиотек
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def supported_encodings() -> list:
+    """Список алгоритмов сжатия, которые клиент умеет распаковывать, в порядке предпочтения"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings += ['gzip', 'deflate']
+    return encodings
+
+
+def accept_encoding() -> str:
+    """Значение заголовка Accept-Encoding для запросов с большими ответами"""
+    return ', '.join(supported_encodings())
+
+
+class _IdentityDecoder:
+    def decompress(self, chunk: bytes) -> bytes:
+        return chunk
+
+    def flush(self) -> bytes:
+        return b''
+
+
+class _DeflateDecoder:
+    """deflate бывает как с zlib-заголовком, так и "сырой" - определяем по первому блоку"""
+
+    def __init__(self):
+        self._obj = None
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if self._obj is None:
+            self._obj = zlib.decompressobj()
+            try:
+                return self._obj.decompress(chunk)
+            except zlib.error:
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._obj.decompress(chunk)
+
+    def flush(self) -> bytes:
+        return self._obj.flush() if self._obj is not None else b''
+
+
+class _BrotliDecoder:
+    def __init__(self):
+        self._obj = brotli.Decompressor()
+
+    def decompress(self, chunk: bytes) -> bytes:
+        # у brotli метод называется process, у brotlicffi - decompress
+        if hasattr(self._obj, 'process'):
+            return self._obj.process(chunk)
+        return self._obj.decompress(chunk)
+
+    def flush(self) -> bytes:
+        return b''
+
+
+def get_decoder(encoding: str):
+    """Возвращает потоковый распаковщик (методы decompress(chunk) и flush()) для значения
+    одного алгоритма из заголовка Content-Encoding"""
+    encoding = (encoding or 'identity').strip().lower()
+    if encoding == 'identity':
+        return _IdentityDecoder()
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        return _DeflateDecoder()
+    if encoding == 'br' and brotli is not None:
+        return _BrotliDecoder()
+    if encoding == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f'Неподдерживаемый Content-Encoding: {encoding}')
+
+
+def decode_chunks(chunks, content_encoding: str):
+    """Потоково распаковывает последовательность блоков. Если алгоритмов несколько
+    (например "gzip, br"), они снимаются в обратном порядке"""
+    decoders = [get_decoder(e) for e in reversed((content_encoding or '').split(',')) if e.strip()]
+    for chunk in chunks:
+        for decoder in decoders:
+            chunk = decoder.decompress(chunk)
+        if chunk:
+            yield chunk
+    tail = b''
+    for decoder in decoders:
+        tail = (decoder.decompress(tail) if tail else b'') + decoder.flush()
+    if tail:
+        yield tail
+
+
+def decode_content(content: bytes, content_encoding: str, chunk_size: int = 64 * 1024) -> bytes:
+    chunks = (content[i:i + chunk_size] for i in range(0, len(content), chunk_size))
+    return b''.join(decode_chunks(chunks, content_encoding))
+
+
+class TransferStats:
+    """Счётчики переданных данных по эндпоинтам: байты на проводе (сжатые) и после распаковки"""
+
+    def __init__(self):
+        self.endpoints = {}
+        self.last = None
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, wire_bytes: int, content_bytes: int, encoding: str = ''):
+        with self._lock:
+            self.last = {'endpoint': endpoint, 'wire_bytes': wire_bytes,
+                         'content_bytes': content_bytes, 'encoding': encoding or 'identity'}
+            totals = self.endpoints.setdefault(endpoint, {'calls': 0, 'wire_bytes': 0, 'content_bytes': 0})
+            totals['calls'] += 1
+            totals['wire_bytes'] += wire_bytes
+            totals['content_bytes'] += content_bytes
+
+    @property
+    def wire_bytes(self) -> int:
+        return sum(t['wire_bytes'] for t in self.endpoints.values())
+
+    @property
+    def content_bytes(self) -> int:
+        return sum(t['content_bytes'] for t in self.endpoints.values())
+
+    @property
+    def ratio(self) -> float:
+        """Во сколько раз сжатие уменьшило трафик (1.0 - сжатия не было)"""
+        return self.content_bytes / self.wire_bytes if self.wire_bytes else 1.0
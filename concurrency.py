@@ -0,0 +1,137 @@
+"""Адаптивное ограничение числа одновременных запросов к PetFriends.
+
+Вместо подбора числа потоков вручную массовые прогоны (fuzz.py и т.п.) запускают пул с запасом,
+а AdaptiveLimiter пропускает к серверу не больше limit запросов одновременно. Пока латентность
+держится у базового уровня и нет ошибок перегрузки, limit растёт на единицу за "окно" запросов
+(аддитивно), при росте латентности уменьшается пропорционально её росту (градиент), а при 429/5xx
+шлюза и сетевых ошибках - в backoff раз (мультипликативно):
+
+    limiter = AdaptiveLimiter(initial=4, max_limit=64)
+    pf = limiter.wrap(PetFriends())
+    ...
+    print(limiter.metrics())
+"""
+import collections
+import threading
+import time
+
+# Коды ответа, которые означают перегрузку сервера, а не ошибку в данных запроса.
+# 500 сюда не входит: PetFriends отвечает им, например, на неизвестный фильтр
+OVERLOAD_STATUSES = (429, 502, 503, 504)
+
+
+class AdaptiveLimiter:
+    """Ограничитель одновременных запросов с лимитом, подстраиваемым по латентности и ошибкам.
+    tolerance - во сколько раз латентность может превысить базовую без снижения лимита,
+    backoff - множитель лимита при перегрузке, window - за сколько секунд считается throughput"""
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 64, tolerance: float = 1.5,
+                 backoff: float = 0.7, window: float = 10.0):
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.window = window
+        self.inflight = 0
+        self.completed = 0
+        self.errors = 0
+        self.base_rtt = None
+        self.started = time.monotonic()
+        self.history = [(self.started, self.limit)]
+        self._finished = collections.deque()
+        self._last_backoff = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> int:
+        """Ждёт свободного места под лимитом. Возвращает число запросов в полёте на момент старта"""
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+            return self.inflight
+
+    def release(self, rtt: float, overload: bool = False, inflight: int = None):
+        """Завершение запроса длительностью rtt секунд; inflight - значение, которое вернул acquire"""
+        with self._cond:
+            now = time.monotonic()
+            self.inflight -= 1
+            self.completed += 1
+            self._finished.append(now)
+            while self._finished and now - self._finished[0] > self.window:
+                self._finished.popleft()
+            if overload:
+                self.errors += 1
+                # Одна волна перегрузки - одно снижение: не чаще раза за базовое время ответа
+                if now - self._last_backoff > (self.base_rtt or 0):
+                    self._set_limit(self.limit * self.backoff, now)
+                    self._last_backoff = now
+            else:
+                self._on_latency(rtt, inflight, now)
+            self._cond.notify_all()
+
+    def _on_latency(self, rtt: float, inflight: int, now: float):
+        # Базовая латентность - минимум, который медленно "подтягивается" вверх, чтобы со временем
+        # забыть случайно быстрый ответ и пережить смену условий сети
+        if self.base_rtt is None or rtt < self.base_rtt:
+            self.base_rtt = rtt
+        else:
+            self.base_rtt += (rtt - self.base_rtt) * 0.01
+        # Изменения делятся на limit: за "окно" из limit запросов лимит вырастет примерно на 1
+        # или уменьшится примерно в gradient раз
+        if rtt > self.base_rtt * self.tolerance:
+            gradient = max(self.backoff, self.base_rtt * self.tolerance / rtt)
+            self._set_limit(self.limit * (1 - (1 - gradient) / max(self.limit, 1)), now)
+        elif inflight is None or inflight >= int(self.limit) - 1:
+            # Растём, только если лимит действительно был узким местом
+            self._set_limit(self.limit + 1 / self.limit, now)
+
+    def _set_limit(self, limit: float, now: float):
+        limit = min(max(limit, self.min_limit), self.max_limit)
+        if int(limit) != int(self.limit):
+            self.history.append((now, limit))
+        self.limit = limit
+
+    @property
+    def throughput(self) -> float:
+        """Завершённых запросов в секунду за последние window секунд"""
+        with self._cond:
+            now = time.monotonic()
+            recent = [t for t in self._finished if now - t <= self.window]
+            if not recent:
+                return 0.0
+            return len(recent) / max(min(self.window, now - self.started), 1e-9)
+
+    def metrics(self) -> dict:
+        return {'limit': int(self.limit), 'inflight': self.inflight, 'completed': self.completed,
+                'errors': self.errors, 'throughput': self.throughput, 'base_rtt': self.base_rtt}
+
+    def wrap(self, pf):
+        """Пропускает все запросы клиента PetFriends через ограничитель. Возвращает тот же pf"""
+        pf.transport = LimitingTransport(pf.transport, self)
+        return pf
+
+
+class LimitingTransport:
+    """Обёртка над любым транспортом, которая выполняет запросы под AdaptiveLimiter"""
+
+    def __init__(self, transport, limiter: AdaptiveLimiter):
+        self.transport = transport
+        self.limiter = limiter
+
+    def request(self, method: str, url: str, headers: dict = None, params: dict = None, data=None):
+        inflight = self.limiter.acquire()
+        started = time.perf_counter()
+        overload = True
+        try:
+            res = self.transport.request(method, url, headers=headers, params=params, data=data)
+            overload = res.status_code in OVERLOAD_STATUSES
+            return res
+        finally:
+            self.limiter.release(time.perf_counter() - started, overload, inflight)
+
+    def __getattr__(self, name):
+        return getattr(self.transport, name)
+
+    def close(self):
+        self.transport.close()
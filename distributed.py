@@ -0,0 +1,272 @@
+"""Распределённый запуск параметризованных тестов на нескольких машинах.
+
+Координатор собирает список тест-кейсов (node id pytest), раздаёт их пачками по TCP и собирает
+результаты в общий отчёт. Исполнители на других машинах забирают пачки и прогоняют их своим
+pytest со своими учётными данными PetFriends. Внешний брокер не нужен.
+
+    python distributed.py coordinator --host 0.0.0.0 --port 8765 --report report.json tests/specs
+    python distributed.py worker --coordinator 10.0.0.1:8765 --token <токен координатора> \
+        --email user1@mail.com --password secret
+
+Координатор по умолчанию слушает только 127.0.0.1. Каждое сообщение должно содержать общий токен
+(--token или переменная PETFRIENDS_DISTRIBUTED_TOKEN; если не задан - координатор создаёт и печатает его).
+"""
+import argparse
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE_ENV = 'PETFRIENDS_RESULTS_FILE'
+TOKEN_ENV = 'PETFRIENDS_DISTRIBUTED_TOKEN'
+
+
+class CollectionError(Exception):
+    pass
+
+
+def collect_cases(pytest_args: list) -> list:
+    """Разворачивает параметризацию: возвращает node id всех тестов, найденных pytest. Если сбор
+    не удался (модуль не импортируется и т.п.), бросает CollectionError с выводом pytest, чтобы
+    такие модули не выпадали из прогона молча"""
+    res = subprocess.run([sys.executable, '-m', 'pytest', '--collect-only', '-q', '-p', 'no:cacheprovider',
+                          *pytest_args], cwd=ROOT, capture_output=True, text=True)
+    errors = [line for line in res.stdout.splitlines() if line.startswith('ERROR ')]
+    # Код 5 - тестов не найдено, это не ошибка сбора
+    if res.returncode not in (0, 5) or errors:
+        raise CollectionError(f'Сбор тестов pytest завершился с ошибкой (код {res.returncode}):\n'
+                              f'{res.stdout[-4000:]}{res.stderr[-2000:]}')
+    return [line.strip() for line in res.stdout.splitlines() if '::' in line]
+
+
+class Coordinator:
+    """Очередь пачек тест-кейсов и сводный отчёт. Пачка, результат которой не пришёл за lease
+    секунд (исполнитель упал или потерял связь), отдаётся другому исполнителю"""
+
+    def __init__(self, cases: list, batch_size: int = 50, lease: float = 600):
+        self.batches = {n: cases[i:i + batch_size] for n, i in enumerate(range(0, len(cases), batch_size))}
+        self.pending = list(self.batches)
+        self.leased = {}
+        self.results = {}
+        self.workers = {}
+        self.lease = lease
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        if not self.batches:
+            self.finished.set()
+
+    def pull(self, worker: str) -> dict:
+        with self.lock:
+            if self.finished.is_set():
+                return {'op': 'done'}
+            now = time.monotonic()
+            for batch, (_, leased_at) in list(self.leased.items()):
+                if now - leased_at > self.lease:
+                    del self.leased[batch]
+                    self.pending.append(batch)
+            if not self.pending:
+                return {'op': 'wait'}
+            batch = self.pending.pop(0)
+            self.leased[batch] = (worker, now)
+            return {'op': 'batch', 'batch': batch, 'cases': self.batches[batch]}
+
+    def submit(self, worker: str, batch: int, results: list) -> dict:
+        with self.lock:
+            # Повторно выданная пачка могла вернуться дважды - учитываем только первый ответ
+            if batch in self.leased or batch in self.pending:
+                self.leased.pop(batch, None)
+                if batch in self.pending:
+                    self.pending.remove(batch)
+                for result in results:
+                    result['worker'] = worker
+                    self.results[result['nodeid']] = result
+                self.workers[worker] = self.workers.get(worker, 0) + len(results)
+                done = len(self.batches) - len(self.pending) - len(self.leased)
+                print(f'[{worker}] пачка {batch}: {summarize(results)} ({done}/{len(self.batches)} пачек)')
+            if not self.pending and not self.leased:
+                self.finished.set()
+        return {'op': 'ok'}
+
+    def report(self) -> dict:
+        with self.lock:
+            results = [self.results[nodeid] for batch in self.batches.values() for nodeid in batch
+                       if nodeid in self.results]
+            return {'summary': summarize(results), 'workers': dict(self.workers), 'results': results}
+
+
+def summarize(results: list) -> dict:
+    summary = {}
+    for result in results:
+        summary[result['outcome']] = summary.get(result['outcome'], 0) + 1
+    return summary
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # Протокол: одна строка JSON с запросом, одна строка JSON с ответом на соединение
+    def handle(self):
+        message = json.loads(self.rfile.readline().decode('utf-8'))
+        coordinator = self.server.coordinator
+        if not hmac.compare_digest(str(message.get('token', '')).encode(), self.server.token.encode()):
+            reply = {'op': 'error', 'error': 'неверный токен'}
+        elif message['op'] == 'pull':
+            reply = coordinator.pull(message['worker'])
+        elif message['op'] == 'results':
+            reply = coordinator.submit(message['worker'], message['batch'], message['results'])
+        else:
+            reply = {'op': 'error', 'error': f'неизвестная операция {message["op"]!r}'}
+        self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, coordinator: Coordinator, host: str = '127.0.0.1', port: int = 8765, token: str = ''):
+        self.coordinator = coordinator
+        self.token = token
+        super().__init__((host, port), _Handler)
+
+
+def call(address: tuple, message: dict, token: str = '', timeout: float = 30) -> dict:
+    with socket.create_connection(address, timeout=timeout) as sock:
+        sock.sendall(json.dumps(dict(message, token=token)).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as stream:
+            reply = json.loads(stream.readline().decode('utf-8'))
+    if reply['op'] == 'error':
+        raise RuntimeError(f'Координатор {address[0]}:{address[1]}: {reply["error"]}')
+    return reply
+
+
+def check_cases(cases: list) -> list:
+    """Кейсы от координатора передаются pytest в командной строке: строка, начинающаяся с "-" или "@",
+    была бы разобрана как опция или файл аргументов (pytest разбирает -p и подобные даже после "--")"""
+    for case in cases:
+        if not isinstance(case, str) or case.startswith(('-', '@')):
+            raise ValueError(f'Недопустимый тест-кейс от координатора: {case!r}')
+    return cases
+
+
+def run_batch(cases: list, env: dict = None) -> list:
+    """Прогоняет пачку тест-кейсов отдельным процессом pytest и возвращает результат по каждому"""
+    fd, results_path = tempfile.mkstemp(suffix='.jsonl')
+    os.close(fd)
+    try:
+        subprocess.run([sys.executable, '-m', 'pytest', '-q', '-p', 'distributed', '-p', 'no:cacheprovider',
+                        '--', *check_cases(cases)], cwd=ROOT,
+                       env={**os.environ, **(env or {}), RESULTS_FILE_ENV: results_path},
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        results = {}
+        with open(results_path, encoding='utf-8') as f:
+            for line in f:
+                merge_report(results, json.loads(line))
+    finally:
+        os.remove(results_path)
+    # Кейсы, по которым pytest ничего не сообщил (например, упал сам процесс), считаем ошибкой
+    return [results.get(nodeid, {'nodeid': nodeid, 'outcome': 'error', 'duration': 0.0,
+                                 'longrepr': 'нет результата от pytest'}) for nodeid in cases]
+
+
+def merge_report(results: dict, report: dict):
+    """Сводит отчёты фаз setup/call/teardown в один результат теста"""
+    result = results.setdefault(report['nodeid'], {'nodeid': report['nodeid'], 'outcome': 'passed',
+                                                   'duration': 0.0, 'longrepr': ''})
+    result['duration'] += report['duration']
+    if report['outcome'] == 'failed':
+        result['outcome'] = 'failed' if report['when'] == 'call' else 'error'
+        result['longrepr'] = report['longrepr']
+    elif report['outcome'] == 'skipped' and result['outcome'] == 'passed':
+        result['outcome'] = 'skipped'
+
+
+def run_worker(address: tuple, name: str = None, env: dict = None, poll: float = 1.0, token: str = '') -> int:
+    """Забирает пачки у координатора, пока тот не сообщит, что всё выполнено. Возвращает
+    число выполненных тест-кейсов"""
+    name = name or f'{socket.gethostname()}-{os.getpid()}'
+    done = 0
+    while True:
+        reply = call(address, {'op': 'pull', 'worker': name}, token)
+        if reply['op'] == 'done':
+            return done
+        if reply['op'] == 'wait':
+            time.sleep(poll)
+            continue
+        results = run_batch(reply['cases'], env)
+        call(address, {'op': 'results', 'worker': name, 'batch': reply['batch'], 'results': results}, token)
+        done += len(results)
+
+
+# Хук pytest: подключается в процессе исполнителя через "-p distributed" и пишет отчёт
+# каждой фазы теста в файл, путь к которому передаётся в переменной окружения
+def pytest_runtest_logreport(report):
+    path = os.environ.get(RESULTS_FILE_ENV)
+    if not path:
+        return
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'nodeid': report.nodeid, 'when': report.when, 'outcome': report.outcome,
+                            'duration': report.duration,
+                            'longrepr': str(report.longrepr) if report.failed else ''}) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Распределённый запуск тестов PetFriends')
+    sub = parser.add_subparsers(dest='mode', required=True)
+    coord = sub.add_parser('coordinator', help='раздать тест-кейсы и собрать общий отчёт')
+    coord.add_argument('--host', default='127.0.0.1', help='0.0.0.0 - принимать исполнителей с других машин')
+    coord.add_argument('--port', type=int, default=8765)
+    coord.add_argument('--batch-size', type=int, default=50)
+    coord.add_argument('--lease', type=float, default=600, help='через сколько секунд переотдать пачку')
+    coord.add_argument('--report', default='distributed_report.json')
+    coord.add_argument('--token', default=os.environ.get(TOKEN_ENV), help='общий токен координатора и исполнителей')
+    coord.add_argument('pytest_args', nargs='*', default=['tests'])
+    worker = sub.add_parser('worker', help='выполнять пачки тест-кейсов координатора')
+    worker.add_argument('--coordinator', required=True, help='адрес координатора host:port')
+    worker.add_argument('--token', default=os.environ.get(TOKEN_ENV), required=not os.environ.get(TOKEN_ENV))
+    worker.add_argument('--name')
+    worker.add_argument('--email', help='свой пользователь PetFriends для этого исполнителя')
+    worker.add_argument('--password')
+    args = parser.parse_args(argv)
+
+    if args.mode == 'coordinator':
+        try:
+            cases = collect_cases(args.pytest_args)
+        except CollectionError as e:
+            print(e, file=sys.stderr)
+            return 2
+        token = args.token or secrets.token_urlsafe(16)
+        coordinator = Coordinator(cases, args.batch_size, args.lease)
+        server = CoordinatorServer(coordinator, args.host, args.port, token)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f'Координатор слушает {args.host}:{args.port}, тест-кейсов: {len(cases)}')
+        if not args.token:
+            print(f'Токен для исполнителей: {token}')
+        coordinator.finished.wait()
+        report = coordinator.report()
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'Итог: {report["summary"]}, отчёт: {args.report}')
+        # Даём исполнителям время получить ответ "done", прежде чем остановить сервер
+        time.sleep(2)
+        server.shutdown()
+        return 0 if set(report['summary']) <= {'passed', 'skipped'} else 1
+
+    host, port = args.coordinator.rsplit(':', 1)
+    env = {}
+    if args.email:
+        env['PETFRIENDS_EMAIL'] = args.email
+    if args.password:
+        env['PETFRIENDS_PASSWORD'] = args.password
+    done = run_worker((host, int(port)), args.name, env, token=args.token)
+    print(f'Выполнено тест-кейсов: {done}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""Локальный HTTP-прокси с внесением сбоев между PetFriends и бэкендом.
+
+Клиент обращается к прокси как к серверу (PetFriends('http://127.0.0.1:8080/') или переменная
+PETFRIENDS_BASE_URL), прокси пересылает запрос бэкенду через транспорт (transport.py) и портит
+ответ по профилю: задержка из распределения, ограничение скорости отдачи, сброс соединения,
+обрезанное тело и HTML-страница ошибки вместо JSON (как у Heroku при падении приложения).
+Бэкендом может быть настоящий сервер или PetFriendsStub (--stub) - тогда сеть не нужна:
+
+    python faultproxy.py --stub --latency lognormal:0.2,0.8 --bandwidth 65536 --reset 0.01 --error-page 0.05
+    PETFRIENDS_BASE_URL=http://127.0.0.1:8080/ python -m pytest tests/test_pet_friends.py
+
+Тело ответа отдаётся распакованным: ограничение скорости относится к самим данным.
+"""
+import argparse
+import math
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from transport import get_transport
+
+# Заголовки соединения, которые прокси не пересылает (RFC 7230, 6.1), и заголовки, которые
+# теряют смысл после распаковки тела транспортом
+HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailer',
+               'transfer-encoding', 'upgrade', 'host', 'content-length', 'content-encoding', 'accept-encoding'}
+
+ERROR_PAGE = ('<!DOCTYPE html><html><head><title>Application Error</title></head><body>'
+              '<h1>Application Error</h1><p>An error occurred in the application and your page could not be '
+              'served.</p></body></html>')
+
+
+def parse_latency(spec: str):
+    """Распределение задержки по описанию: 0.2 (постоянная, с), uniform:мин,макс, normal:среднее,сигма,
+    lognormal:медиана,сигма (логарифма), pareto:минимум,альфа (тяжёлый хвост). Возвращает функцию rng -> секунды"""
+    name, _, args = spec.partition(':') if ':' in spec else ('fixed', '', spec)
+    values = [float(v) for v in args.split(',')] if args else []
+    if name == 'fixed':
+        return lambda rng: values[0]
+    if name == 'uniform':
+        return lambda rng: rng.uniform(*values)
+    if name == 'normal':
+        return lambda rng: max(rng.gauss(*values), 0.0)
+    if name == 'lognormal':
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    if name == 'pareto':
+        return lambda rng: values[0] * rng.paretovariate(values[1])
+    raise ValueError(f'Неизвестное распределение задержки {name!r}: fixed, uniform, normal, lognormal, pareto')
+
+
+class FaultProfile:
+    """Какие сбои вносить: latency - описание распределения (см. parse_latency), bandwidth - байт в
+    секунду при отдаче тела (0 - без ограничения), reset, truncate, error_page - вероятности сброса
+    соединения без ответа, обрыва на середине тела и HTML-страницы с кодом error_status"""
+
+    def __init__(self, latency: str = None, bandwidth: int = 0, reset: float = 0.0, truncate: float = 0.0,
+                 error_page: float = 0.0, error_status: int = 503, seed: int = None):
+        self.latency = parse_latency(latency) if latency else None
+        self.bandwidth = bandwidth
+        self.reset = reset
+        self.truncate = truncate
+        self.error_page = error_page
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def choose(self) -> tuple:
+        """(задержка, сбой): сбой - 'reset', 'error_page', 'truncate' или None"""
+        with self._lock:
+            delay = self.latency(self.rng) if self.latency else 0.0
+            roll = self.rng.random()
+        for fault in ('reset', 'error_page', 'truncate'):
+            probability = getattr(self, fault)
+            if roll < probability:
+                return delay, fault
+            roll -= probability
+        return delay, None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';', 1)[0], 16)
+                if not size:
+                    self.rfile.readline()
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def _reset(self):
+        # SO_LINGER с нулевым таймаутом: close() отправляет RST, клиент видит "connection reset by peer"
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        self.close_connection = True
+
+    def _send(self, status: int, headers: list, body: bytes, truncate: bool = False):
+        self.send_response(status)
+        for name, value in headers:
+            if name.lower() not in HOP_HEADERS:
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if truncate:
+            # Заявлена полная длина, а отдаём половину и рвём соединение
+            body = body[:len(body) // 2]
+            self.close_connection = True
+        bandwidth = self.server.profile.bandwidth
+        step = max(bandwidth // 10, 1) if bandwidth else len(body) or 1
+        for start in range(0, len(body), step):
+            chunk = body[start:start + step]
+            if bandwidth:
+                # Блок "передаётся" len(chunk) / bandwidth секунд и только потом уходит клиенту
+                time.sleep(len(chunk) / bandwidth)
+            self.wfile.write(chunk)
+            self.wfile.flush()
+        if truncate:
+            self.wfile.flush()
+            self._reset()
+
+    def _proxy(self):
+        proxy = self.server
+        body = self._read_body()
+        delay, fault = proxy.profile.choose()
+        proxy.count('requests', *([fault] if fault else []))
+        if delay:
+            time.sleep(delay)
+        if fault == 'reset':
+            self._reset()
+            return
+        if fault == 'error_page':
+            self._send(proxy.profile.error_status, [('Content-Type', 'text/html; charset=utf-8')],
+                       ERROR_PAGE.encode('utf-8'))
+            return
+        headers = {name: value for name, value in self.headers.items() if name.lower() not in HOP_HEADERS}
+        try:
+            res = proxy.transport.request(self.command, proxy.upstream + self.path.lstrip('/'), headers=headers,
+                                          data=body or None)
+        except Exception as e:
+            proxy.count('upstream_error')
+            self._send(502, [('Content-Type', 'text/plain; charset=utf-8')],
+                       f'Bad Gateway: {type(e).__name__}'.encode('utf-8'))
+            return
+        self._send(res.status_code, list(res.headers.items()), res.content, truncate=fault == 'truncate')
+
+    do_GET = do_POST = do_PUT = do_DELETE = _proxy
+
+
+class FaultProxy(ThreadingHTTPServer):
+    """Прокси на host:port (port=0 - любой свободный) к бэкенду upstream через transport.
+    В stats - число запросов и внесённых сбоев каждого вида"""
+
+    daemon_threads = True
+
+    def __init__(self, upstream: str, profile: FaultProfile = None, transport=None, host: str = '127.0.0.1',
+                 port: int = 0):
+        self.upstream = upstream.rstrip('/') + '/'
+        self.profile = profile or FaultProfile()
+        self.transport = transport or get_transport()
+        self.stats = {'requests': 0, 'reset': 0, 'error_page': 0, 'truncate': 0, 'upstream_error': 0}
+        self._stats_lock = threading.Lock()
+        super().__init__((host, port), _Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def count(self, *names):
+        with self._stats_lock:
+            for name in names:
+                self.stats[name] += 1
+
+    def shutdown_request(self, request):
+        # После _reset соединение закрывается сразу, без FIN от shutdown(SHUT_WR), чтобы ушёл RST
+        if request.getsockopt(socket.SOL_SOCKET, socket.SO_LINGER, 8) == struct.pack('ii', 1, 0):
+            self.close_request(request)
+        else:
+            super().shutdown_request(request)
+
+    def start(self):
+        """Запускает прокси в фоновом потоке. Возвращает сам прокси"""
+        threading.Thread(target=self.serve_forever, args=(0.05,), name='fault-proxy', daemon=True).start()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Прокси с внесением сбоев и задержек между PetFriends и бэкендом')
+    parser.add_argument('--upstream', default='https://petfriends1.herokuapp.com/', help='адрес бэкенда')
+    parser.add_argument('--stub', action='store_true', help='бэкенд - PetFriendsStub в этом процессе, без сети')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', help='распределение задержки: 0.2, uniform:0.1,0.5, normal:0.3,0.1, '
+                                          'lognormal:0.2,0.8, pareto:0.1,1.5 (секунды)')
+    parser.add_argument('--bandwidth', type=int, default=0, help='скорость отдачи тела, байт/с')
+    parser.add_argument('--reset', type=float, default=0.0, help='доля запросов со сбросом соединения')
+    parser.add_argument('--truncate', type=float, default=0.0, help='доля ответов с обрезанным телом')
+    parser.add_argument('--error-page', type=float, default=0.0, help='доля ответов HTML-страницей ошибки')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    profile = FaultProfile(args.latency, args.bandwidth, args.reset, args.truncate, args.error_page,
+                           args.error_status, args.seed)
+    transport = None
+    if args.stub:
+        from petfriends_stub import PetFriendsStub
+        from settings import valid_email, valid_password
+        from transport import WSGITransport
+        transport = WSGITransport(PetFriendsStub({valid_email: valid_password}))
+    proxy = FaultProxy(args.upstream, profile, transport, args.host, args.port)
+    print(f'Прокси {proxy.url} -> {"PetFriendsStub" if args.stub else proxy.upstream}')
+    try:
+        proxy.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.server_close()
+        print('Статистика: ' + ', '.join(f'{name} {value}' for name, value in proxy.stats.items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
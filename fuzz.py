@@ -0,0 +1,247 @@
+"""Фаззинг входных данных add_new_pet_simple и update_pet_info.
+
+Случайные name/animal_type/age выполняются параллельно, ответы группируются по "поведению"
+(операция, код ответа, формат ответа, совпадение полей с отправленными). Для каждого нового
+ошибочного поведения входные данные минимизируются и сохраняются в корпус, который потом можно
+быстро прогнать повторно:
+
+    python fuzz.py --iterations 5000 --workers 16 --seed 1
+    python fuzz.py --iterations 5000 --adaptive
+    python fuzz.py --replay
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import string
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from api import PetFriends
+from concurrency import AdaptiveLimiter
+from settings import valid_email, valid_password
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fuzz_corpus')
+FIELDS = ('name', 'animal_type', 'age')
+OPERATIONS = ('add', 'update')
+
+ALPHABETS = {
+    'latin': string.ascii_letters,
+    'digits': string.digits,
+    'russian': 'абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ',
+    'chinese': '的一是不了人我在有他这为之大来以个中上们',
+    'specials': '|\\/!@#$%^&*()-_=+`~?"№;:[]{}\'<>,.',
+    'whitespace': ' \t\n\r  ',
+    'control': ''.join(map(chr, range(1, 32))) + '\x7f',
+    'emoji': '😀🐱🐶🦜🐍',
+}
+LENGTHS = (1, 2, 3, 10, 50, 254, 255, 256, 1000, 1001, 5000)
+SPECIAL_VALUES = ('', ' ', '0', '-1', '1', '9', '49', '50', '100', '1.5', '1,5', '1e3', '2147483647', '2147483648',
+                  '-2147483649', '9' * 40, 'null', 'None', 'NaN', 'true', '[]', '{}', "' OR 1=1 --",
+                  '<script>alert(1)</script>', '../../etc/passwd', '%00', '\x00')
+
+
+def random_value(rng: random.Random, field: str) -> str:
+    """Случайное значение поля: граничное/особое значение или строка случайной длины из 1-2 алфавитов"""
+    if rng.random() < 0.3:
+        return rng.choice(SPECIAL_VALUES)
+    if field == 'age' and rng.random() < 0.5:
+        return str(rng.choice([rng.randint(-10, 100), rng.randint(-2 ** 40, 2 ** 40), rng.uniform(-100, 100)]))
+    alphabet = ''.join(rng.sample(sorted(ALPHABETS.values()), rng.choice([1, 2])))
+    return ''.join(rng.choice(alphabet) for _ in range(rng.choice(LENGTHS)))
+
+
+def random_case(rng: random.Random) -> dict:
+    case = {'op': rng.choice(OPERATIONS)}
+    for field in FIELDS:
+        case[field] = random_value(rng, field)
+    return case
+
+
+def default_oracle(case: dict, status: int, result) -> bool:
+    """Считаем ошибкой 5xx и успешный ответ, в котором поля питомца не совпадают с отправленными"""
+    if status >= 500:
+        return True
+    return status == 200 and isinstance(result, dict) and any(str(result.get(f)) != case[f] for f in FIELDS)
+
+
+class Fuzzer:
+    """Генерирует и параллельно выполняет тест-кейсы, дедуплицирует по сигнатуре поведения
+    и минимизирует ошибочные входные данные"""
+
+    def __init__(self, pf: PetFriends, auth_key: dict, oracle=default_oracle, workers: int = 8,
+                 seed: int = None, corpus_dir: str = DEFAULT_CORPUS, max_shrink_steps: int = 200):
+        self.pf = pf
+        self.auth_key = auth_key
+        self.oracle = oracle
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.corpus_dir = corpus_dir
+        self.max_shrink_steps = max_shrink_steps
+        self.signatures = {}
+        self.created = []
+        self._lock = threading.Lock()
+        self._target_id = None
+
+    def target_id(self) -> str:
+        """Питомец, на котором фаззится update_pet_info"""
+        if self._target_id is None:
+            status, pet = self.pf.add_new_pet_simple(self.auth_key, 'Матюся', 'британец', '9')
+            if status != 200 or not isinstance(pet, dict) or 'id' not in pet:
+                raise RuntimeError(f'Не удалось создать питомца для фаззинга update_pet_info: '
+                                   f'{status} {str(pet)[:200]}')
+            self._target_id = pet['id']
+            self.created.append(pet['id'])
+        return self._target_id
+
+    def execute(self, case: dict) -> tuple:
+        """Выполняет кейс и возвращает (сигнатура поведения, ошибка ли это). Исключение транспорта
+        (сброс соединения, таймаут) - тоже поведение: оно считается ошибкой и не прерывает прогон"""
+        target_id = self.target_id() if case['op'] == 'update' else None
+        try:
+            if case['op'] == 'add':
+                status, result = self.pf.add_new_pet_simple(self.auth_key, case['name'], case['animal_type'],
+                                                            case['age'])
+                if status == 200 and isinstance(result, dict) and 'id' in result:
+                    with self._lock:
+                        self.created.append(result['id'])
+            else:
+                status, result = self.pf.update_pet_info(self.auth_key, target_id, case['name'],
+                                                         case['animal_type'], case['age'])
+        except Exception as e:
+            return f'{case["op"]}:exc:{type(e).__name__}', True
+        failed = self.oracle(case, status, result)
+        if isinstance(result, dict):
+            kind = 'json:' + ','.join(sorted(result))
+        else:
+            kind = 'text' if result else 'empty'
+        return f'{case["op"]}:{status}:{kind}:{"fail" if failed else "ok"}', failed
+
+    def run(self, iterations: int) -> dict:
+        """Выполняет iterations случайных кейсов. Возвращает отчёт с числом выполненных кейсов,
+        найденными сигнатурами и минимизированными ошибочными кейсами"""
+        cases = [random_case(self.rng) for _ in range(iterations)]
+        self.target_id()
+        new_failures = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for case, (signature, failed) in zip(cases, pool.map(self.execute, cases)):
+                if signature not in self.signatures:
+                    self.signatures[signature] = case
+                    if failed:
+                        new_failures[signature] = case
+        # Минимизация - последовательная: каждый шаг зависит от результата предыдущего
+        minimized = {signature: self.shrink(case, signature) for signature, case in new_failures.items()}
+        for signature, case in minimized.items():
+            self.save(case, signature)
+        return {'executed': iterations, 'signatures': dict(self.signatures), 'failures': minimized}
+
+    def shrink(self, case: dict, signature: str) -> dict:
+        """Жадно упрощает поля кейса (пустая строка, половины, удаление кусков, замена символов на 'a'),
+        пока кейс воспроизводит ту же сигнатуру"""
+        steps = 0
+        for field in FIELDS:
+            improved = True
+            while improved and steps < self.max_shrink_steps:
+                improved = False
+                for candidate in self._candidates(case[field]):
+                    steps += 1
+                    trial = dict(case, **{field: candidate})
+                    if self.execute(trial)[0] == signature:
+                        case, improved = trial, True
+                        break
+                    if steps >= self.max_shrink_steps:
+                        break
+        return case
+
+    @staticmethod
+    def _candidates(value: str):
+        if value == '':
+            return
+        yield ''
+        size = len(value) // 2
+        while size >= 1:
+            for start in range(0, len(value), size):
+                candidate = value[:start] + value[start + size:]
+                if candidate != value:
+                    yield candidate
+            size //= 2
+        simple = ''.join('a' if ch.isalpha() and ch != 'a' else ch for ch in value)
+        if simple != value:
+            yield simple
+
+    def save(self, case: dict, signature: str):
+        if not self.corpus_dir:
+            return
+        os.makedirs(self.corpus_dir, exist_ok=True)
+        name = hashlib.sha1(signature.encode('utf-8')).hexdigest()[:16] + '.json'
+        with open(os.path.join(self.corpus_dir, name), 'w', encoding='utf-8') as f:
+            json.dump({'signature': signature, 'case': case}, f, ensure_ascii=False, indent=2)
+
+    def replay(self) -> list:
+        """Повторно выполняет кейсы корпуса. Возвращает [(кейс, сохранённая сигнатура, текущая сигнатура)]"""
+        entries = load_corpus(self.corpus_dir)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            signatures = list(pool.map(lambda entry: self.execute(entry['case'])[0], entries))
+        return [(entry['case'], entry['signature'], signature) for entry, signature in zip(entries, signatures)]
+
+    def cleanup(self) -> int:
+        """Удаляет всех питомцев, созданных во время фаззинга"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            statuses = list(pool.map(lambda pet_id: self.pf.delete_pet(self.auth_key, pet_id)[0], self.created))
+        self.created = []
+        self._target_id = None
+        return statuses.count(200)
+
+
+def load_corpus(corpus_dir: str = DEFAULT_CORPUS) -> list:
+    if not os.path.isdir(corpus_dir):
+        return []
+    entries = []
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.endswith('.json'):
+            with open(os.path.join(corpus_dir, name), encoding='utf-8') as f:
+                entries.append(json.load(f))
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Фаззинг создания и обновления питомцев PetFriends')
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--replay', action='store_true', help='только прогнать сохранённый корпус')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='подбирать число одновременных запросов по латентности и ошибкам (до --workers)')
+    args = parser.parse_args(argv)
+
+    pf = PetFriends()
+    limiter = None
+    if args.adaptive:
+        limiter = AdaptiveLimiter(max_limit=args.workers)
+        limiter.wrap(pf)
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    fuzzer = Fuzzer(pf, auth_key, workers=args.workers, seed=args.seed, corpus_dir=args.corpus)
+    try:
+        if args.replay:
+            changed = [(case, old, new) for case, old, new in fuzzer.replay() if old != new]
+            for case, old, new in changed:
+                print(f'{old} -> {new}: {case}')
+            print(f'Кейсов в корпусе: {len(load_corpus(args.corpus))}, изменили поведение: {len(changed)}')
+            return 1 if changed else 0
+        report = fuzzer.run(args.iterations)
+        print(f'Выполнено кейсов: {report["executed"]}, различных поведений: {len(report["signatures"])}')
+        for signature, case in report['failures'].items():
+            print(f'{signature}: {case}')
+        if limiter is not None:
+            print('Ограничитель: ' + ', '.join(f'{k} {v:.3g}' if isinstance(v, float) else f'{k} {v}'
+                                                for k, v in limiter.metrics().items()))
+        return 1 if report['failures'] else 0
+    finally:
+        fuzzer.cleanup()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
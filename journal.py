@@ -0,0 +1,249 @@
+import atexit
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: без flock журнал работает, но одновременные сессии на одной машине не различаются
+    fcntl = None
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.petfriends_journal.jsonl')
+
+
+class PetJournal:
+    """Журнал питомцев, созданных через PetFriends. Файл только дописывается (JSON по строке),
+    fsync делается пачками - раз в sync_every записей или раз в sync_interval секунд. После падения
+    процесса по журналу можно найти и удалить "осиротевших" питомцев (см. collect_garbage).
+
+    Журнал может быть общим у нескольких процессов (распределённые исполнители, soak рядом с тестами).
+    Каждая запись помечена владельцем (хост, pid и id сессии), а владелец держит flock на своём
+    файле в каталоге <path>.owners: пока блокировка занята, его питомцы считаются используемыми.
+    Дописывание идёт под разделяемой блокировкой <path>.lock, переписывание (compact) - под
+    исключительной, поэтому записи других процессов не теряются при замене файла"""
+
+    def __init__(self, path: str = DEFAULT_PATH, sync_every: int = 32, sync_interval: float = 1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._file = None
+        self._lock_file = None
+        self._owner_file = None
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def created(self, pet_id: str, auth_key: str, base_url: str):
+        self._append({'op': 'created', 'id': pet_id, 'key': auth_key, 'base_url': base_url, 'owner': self.owner})
+
+    def deleted(self, pet_id: str):
+        self._append({'op': 'deleted', 'id': pet_id})
+
+    def _owner_path(self, owner: str) -> str:
+        return os.path.join(self.path + '.owners', owner.rsplit(':', 2)[-2] + '-' + owner.rsplit(':', 1)[-1])
+
+    def _flock(self, operation):
+        if fcntl is None:
+            return
+        if self._lock_file is None:
+            self._lock_file = open(self.path + '.lock', 'a')
+        fcntl.flock(self._lock_file, operation)
+
+    def _register_owner(self):
+        # Блокировка владельца берётся до первой записи и держится до close
+        if fcntl is None or self._owner_file is not None:
+            return
+        # Файл появляется под своим именем уже заблокированным, иначе owner_alive другого процесса
+        # мог бы успеть счесть его брошенным и удалить
+        os.makedirs(self.path + '.owners', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path + '.owners')
+        self._owner_file = open(fd, 'a')
+        fcntl.flock(self._owner_file, fcntl.LOCK_EX)
+        os.replace(tmp_path, self._owner_path(self.owner))
+
+    def _append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._register_owner()
+            self._flock(fcntl and fcntl.LOCK_SH)
+            try:
+                if self._file is not None and self._replaced():
+                    self._file.close()
+                    self._file = None
+                if self._file is None:
+                    self._file = open(self.path, 'a', encoding='utf-8')
+                self._file.write(line)
+                # Строка сразу уходит в файл, чтобы её увидел compact другого процесса; fsync - пачками
+                self._file.flush()
+                self._unsynced += 1
+                if self._unsynced >= self.sync_every or time.monotonic() - self._synced_at >= self.sync_interval:
+                    self._sync()
+            finally:
+                self._flock(fcntl and fcntl.LOCK_UN)
+
+    def _replaced(self) -> bool:
+        """Файл журнала заменён compact другого процесса - открытый дескриптор смотрит на старый файл"""
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def sync(self):
+        with self._lock:
+            if self._file is not None and self._unsynced:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                if self._unsynced:
+                    self._sync()
+                self._file.close()
+                self._file = None
+            if self._owner_file is not None:
+                os.remove(self._owner_path(self.owner))
+                self._owner_file.close()
+                self._owner_file = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def owner_alive(self, owner: str) -> bool:
+        """Жив ли процесс-владелец записей: свой - всегда, на другом хосте - проверить нельзя, считаем живым"""
+        if owner is None:
+            return False
+        if owner == self.owner:
+            return True
+        host, pid, _ = owner.rsplit(':', 2)
+        if host != socket.gethostname():
+            return True
+        if fcntl is None:
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return False
+            except OSError:
+                pass
+            return True
+        try:
+            f = open(self._owner_path(owner), 'r+')
+        except FileNotFoundError:
+            return False
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            # Процесс завершился, не убрав за собой файл владельца
+            try:
+                os.remove(f.name)
+            except FileNotFoundError:
+                pass
+            return False
+
+    def orphaned(self, base_url: str = None) -> dict:
+        """Неудалённые питомцы, которые можно убирать: свои и тех владельцев, чьих процессов уже нет"""
+        alive = {}
+        pets = {}
+        for pet_id, record in self.pending(base_url).items():
+            owner = record.get('owner')
+            if owner not in alive:
+                alive[owner] = owner != self.owner and self.owner_alive(owner)
+            if not alive[owner]:
+                pets[pet_id] = record
+        return pets
+
+    def pending(self, base_url: str = None) -> dict:
+        """Питомцы, которые были созданы, но не удалены: {id: запись о создании}.
+        Недописанная последняя строка (процесс упал во время записи) пропускается"""
+        self.sync()
+        with self._lock:
+            pets = self._read_pending()
+        if base_url is not None:
+            pets = {pet_id: r for pet_id, r in pets.items() if r['base_url'] == base_url}
+        return pets
+
+    def compact(self):
+        """Переписывает журнал, оставляя только неудалённых питомцев (в том числе чужих)"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._flock(fcntl and fcntl.LOCK_EX)
+            try:
+                records = self._read_pending()
+                fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.',
+                                                dir=os.path.dirname(os.path.abspath(self.path)))
+                with open(fd, 'w', encoding='utf-8') as f:
+                    for record in records.values():
+                        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            finally:
+                self._flock(fcntl and fcntl.LOCK_UN)
+
+    def _read_pending(self) -> dict:
+        pets = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.decoder.JSONDecodeError:
+                        continue
+                    if record['op'] == 'created':
+                        pets[record['id']] = record
+                    else:
+                        pets.pop(record['id'], None)
+        return pets
+
+
+def collect_garbage(pf, journal: PetJournal, auth_key: dict = None, workers: int = 8) -> int:
+    """Параллельно удаляет неудалённых питомцев из журнала, созданных на сервере pf.base_url этим
+    процессом или процессами, которых уже нет (питомцы живых сессий не трогаем, см. PetJournal.orphaned).
+    Удаление идёт с ключом, которым питомец создавался; если ключ уже не действует (403) и передан
+    auth_key - повторяем с ним. Возвращает число удалённых питомцев"""
+    pets = journal.orphaned(pf.base_url)
+
+    def delete(record):
+        status, _ = pf.delete_pet({'key': record['key']}, record['id'])
+        if status == 403 and auth_key is not None:
+            status, _ = pf.delete_pet(auth_key, record['id'])
+        if status == 200 and pf.journal is not journal:
+            journal.deleted(record['id'])
+        return status == 200
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        deleted = sum(pool.map(delete, pets.values()))
+    journal.compact()
+    return deleted
+
+
+_default_journal = None
+
+
+def default_journal():
+    """Общий на процесс журнал. Путь задаётся переменной окружения PETFRIENDS_JOURNAL,
+    пустое значение отключает журнал"""
+    global _default_journal
+    path = os.environ.get('PETFRIENDS_JOURNAL', DEFAULT_PATH)
+    if not path:
+        return None
+    if _default_journal is None:
+        _default_journal = PetJournal(path)
+        atexit.register(_default_journal.close)
+    return _default_journal
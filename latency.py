@@ -0,0 +1,150 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+
+import pytest
+
+from warmup import is_cold, touch
+
+DEFAULT_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'latency_baselines.json')
+
+# Методы PetFriends, время которых можно отслеживать через LatencyRecorder.watch
+PETFRIENDS_METHODS = ('get_api_key', 'get_list_of_pets', 'add_new_pet_with_photo', 'delete_pet', 'update_pet_info',
+                      'post_add_new_pet_no_photo', 'post_add_photo_pet', 'add_new_pet_simple')
+
+# Статистики сводки (см. summarize), на которые можно задать бюджет
+BUDGET_STATS = ('p50', 'p95', 'p99', 'max')
+
+
+def percentile(samples: list, q: float) -> float:
+    """Перцентиль q (0..100) с линейной интерполяцией между соседними значениями"""
+    if not samples:
+        return float('nan')
+    ordered = sorted(samples)
+    pos = (len(ordered) - 1) * q / 100
+    low, high = math.floor(pos), math.ceil(pos)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def trim_outliers(samples: list, k: float = 3.0) -> tuple:
+    """Отбрасывает "далёкие" выбросы сверху (больше Q3 + k*IQR) - паузы GC, повторы TCP и т.п.
+    Возвращает (оставшиеся замеры, число отброшенных)"""
+    if len(samples) < 4:
+        return list(samples), 0
+    q1, q3 = percentile(samples, 25), percentile(samples, 75)
+    fence = q3 + k * (q3 - q1)
+    kept = [s for s in samples if s <= fence]
+    return kept, len(samples) - len(kept)
+
+
+def summarize(samples: list, outlier_k: float = 3.0) -> dict:
+    kept, outliers = trim_outliers(samples, outlier_k) if outlier_k else (list(samples), 0)
+    return {'count': len(kept), 'outliers': outliers, 'p50': percentile(kept, 50),
+            'p95': percentile(kept, 95), 'p99': percentile(kept, 99), 'max': max(kept) if kept else float('nan')}
+
+
+class LatencyRecorder:
+    """Собирает длительности вызовов по имени метода (в секундах). samples и warmup - число
+    замеров и прогревочных вызовов по умолчанию для measure. Холодные замеры (прогревочные вызовы
+    и вызовы к ещё не прогретому бэкенду, см. warmup.is_cold) копятся отдельно в cold_samples
+    и в бюджеты не входят"""
+
+    def __init__(self, samples: int = 20, warmup: int = 3):
+        self.samples = {}
+        self.cold_samples = {}
+        self.default_samples = samples
+        self.default_warmup = warmup
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, cold: bool = False):
+        with self._lock:
+            (self.cold_samples if cold else self.samples).setdefault(name, []).append(seconds)
+
+    def _timed(self, name: str, base_url, func, *args, cold: bool = False, **kwargs):
+        cold = cold or (base_url is not None and is_cold(base_url))
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.record(name, time.perf_counter() - started, cold)
+            if base_url is not None:
+                touch(base_url)
+
+    def measure(self, func, *args, samples: int = None, warmup: int = None, name: str = None, **kwargs):
+        """Вызывает func warmup + samples раз, прогревочные вызовы записываются как холодные.
+        Возвращает результат последнего вызова"""
+        name = name or func.__name__
+        samples = self.default_samples if samples is None else samples
+        warmup = self.default_warmup if warmup is None else warmup
+        base_url = getattr(getattr(func, '__self__', None), 'base_url', None)
+        result = None
+        for n in range(warmup + samples):
+            result = self._timed(name, base_url, func, *args, cold=n < warmup, **kwargs)
+        return result
+
+    def watch(self, pf, methods=PETFRIENDS_METHODS):
+        """Оборачивает методы экземпляра PetFriends, чтобы записывать время каждого вызова"""
+        for name in methods:
+            method = getattr(pf, name)
+
+            @functools.wraps(method)
+            def timed(*args, _method=method, _name=name, **kwargs):
+                return self._timed(_name, pf.base_url, _method, *args, **kwargs)
+
+            setattr(pf, name, timed)
+        return pf
+
+
+def check_budgets(recorder: LatencyRecorder, budgets: dict, outlier_k: float = 3.0) -> tuple:
+    """Сверяет тёплые замеры с бюджетами вида {'get_list_of_pets': {'p95': 0.8}}.
+    Возвращает (сводка по методам, список нарушений). Сводка холодных замеров - в ключе 'cold'"""
+    for name, limits in budgets.items():
+        for stat in limits:
+            if stat not in BUDGET_STATS:
+                raise pytest.UsageError(f'Бюджет латентности {name}: неизвестная статистика {stat!r}, '
+                                        f'допустимы {", ".join(BUDGET_STATS)}')
+    summaries, violations = {}, []
+    for name, limits in budgets.items():
+        samples = recorder.samples.get(name, [])
+        if not samples:
+            violations.append(f'{name}: нет замеров для проверки бюджета')
+            continue
+        summary = summaries[name] = summarize(samples, outlier_k)
+        if recorder.cold_samples.get(name):
+            summary['cold'] = summarize(recorder.cold_samples[name], 0)
+        for stat, limit in limits.items():
+            if summary[stat] > limit:
+                violations.append(f'{name}: {stat} = {summary[stat] * 1000:.0f} мс > бюджета {limit * 1000:.0f} мс '
+                                  f'({summary["count"]} замеров, выбросов {summary["outliers"]})')
+    return summaries, violations
+
+
+class Baselines:
+    """Сохранённые эталонные значения латентности: {ключ: {'p50': ..., 'p95': ...}} в JSON-файле"""
+
+    def __init__(self, path: str = DEFAULT_BASELINES):
+        self.path = path
+        self.data = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def compare(self, key: str, summary: dict, tolerance: float = 0.2) -> list:
+        """Список регрессий: перцентили, выросшие больше чем на tolerance относительно эталона"""
+        baseline = self.data.get(key)
+        if not baseline:
+            return []
+        return [f'{key}: {stat} = {summary[stat] * 1000:.0f} мс, эталон {baseline[stat] * 1000:.0f} мс '
+                f'(+{(summary[stat] / baseline[stat] - 1) * 100:.0f}%)'
+                for stat in ('p50', 'p95') if stat in baseline and baseline[stat] > 0
+                and summary[stat] > baseline[stat] * (1 + tolerance)]
+
+    def update(self, key: str, summary: dict):
+        self.data[key] = {stat: summary[stat] for stat in ('p50', 'p95', 'p99')}
+
+    def save(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2, sort_keys=True)
@@ -0,0 +1,158 @@
+import base64
+import email.policy
+import gzip
+import json
+import threading
+import uuid
+from email.parser import BytesParser
+from urllib.parse import parse_qs
+
+
+class PetFriendsStub:
+    """Упрощённая in-memory реализация REST API PetFriends в виде WSGI-приложения.
+    Используется вместе с transport.WSGITransport для быстрых тестов без сети.
+    Повторяет известное поведение сервера: 403 с текстом Forbidden при неверном ключе,
+    500 на неизвестный фильтр и пустой ответ на удаление питомца"""
+
+    def __init__(self, users: dict = None):
+        # users - словарь {email: password} зарегистрированных пользователей
+        self.users = dict(users or {})
+        self.keys = {}
+        self.pets = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO', '')
+        try:
+            if path == '/api/key' and method == 'GET':
+                status, body = self.get_key(environ)
+            else:
+                user = self.keys.get(environ.get('HTTP_AUTH_KEY'))
+                if user is None and path.startswith('/api/'):
+                    status, body = 403, self.error_page('403 Forbidden')
+                else:
+                    status, body = self.route(method, path, environ, user)
+        except Exception:
+            status, body = 500, self.error_page('500 Internal Server Error')
+        if isinstance(body, (dict, list)):
+            content, content_type = json.dumps(body).encode('utf-8'), 'application/json'
+        else:
+            content, content_type = body.encode('utf-8'), 'text/html; charset=utf-8'
+        headers = [('Content-Type', content_type)]
+        # Как и настоящий сервер за балансировщиком, сжимаем ответ, если клиент согласен на gzip
+        if 'gzip' in environ.get('HTTP_ACCEPT_ENCODING', ''):
+            content = gzip.compress(content)
+            headers.append(('Content-Encoding', 'gzip'))
+        headers.append(('Content-Length', str(len(content))))
+        start_response(f'{status} {self.reason(status)}', headers)
+        return [content]
+
+    @staticmethod
+    def reason(status: int) -> str:
+        return {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+                405: 'Method Not Allowed', 500: 'Internal Server Error'}.get(status, '')
+
+    @staticmethod
+    def error_page(title: str) -> str:
+        return f'<!DOCTYPE html><title>{title}</title><h1>{title.split(" ", 1)[1]}</h1>'
+
+    def route(self, method, path, environ, user):
+        if path == '/api/pets' and method == 'GET':
+            return self.list_pets(environ, user)
+        if path == '/api/pets' and method == 'POST':
+            return self.create_pet(self.read_form(environ), user)
+        if path == '/api/create_pet_simple' and method == 'POST':
+            return self.create_pet(self.read_form(environ), user)
+        if path.startswith('/api/pets/set_photo/') and method == 'POST':
+            return self.set_photo(path.rsplit('/', 1)[1], self.read_form(environ), user)
+        if path.startswith('/api/pets/') and path != '/api/pets/':
+            pet_id = path[len('/api/pets/'):]
+            if method == 'DELETE':
+                return self.delete_pet(pet_id, user)
+            if method == 'PUT':
+                return self.update_pet(pet_id, self.read_form(environ), user)
+            return 405, self.error_page('405 Method Not Allowed')
+        return 404, self.error_page('404 Not Found')
+
+    def get_key(self, environ):
+        email, password = environ.get('HTTP_EMAIL', ''), environ.get('HTTP_PASSWORD', '')
+        if not email or self.users.get(email) != password:
+            return 403, self.error_page('403 Forbidden')
+        with self.lock:
+            for key, owner in self.keys.items():
+                if owner == email:
+                    return 200, {'key': key}
+            key = uuid.uuid4().hex
+            self.keys[key] = email
+        return 200, {'key': key}
+
+    def list_pets(self, environ, user):
+        pet_filter = parse_qs(environ.get('QUERY_STRING', '')).get('filter', [''])[0]
+        with self.lock:
+            pets = list(self.pets.values())
+        if pet_filter == 'my_pets':
+            pets = [pet for pet in pets if pet['user_id'] == user]
+        elif pet_filter != '':
+            return 500, self.error_page('500 Internal Server Error')
+        return 200, {'pets': pets}
+
+    def create_pet(self, form, user):
+        pet = {'id': uuid.uuid4().hex, 'name': form.get('name', ''), 'animal_type': form.get('animal_type', ''),
+               'age': form.get('age', ''), 'pet_photo': self.photo_uri(form.get('pet_photo')),
+               'user_id': user, 'created_at': ''}
+        with self.lock:
+            self.pets[pet['id']] = pet
+        return 200, pet
+
+    def set_photo(self, pet_id, form, user):
+        with self.lock:
+            pet = self.pets.get(pet_id)
+            if pet is None or pet['user_id'] != user:
+                return 400, self.error_page('400 Bad Request')
+            if form.get('pet_photo') is None:
+                return 400, self.error_page('400 Bad Request')
+            pet['pet_photo'] = self.photo_uri(form['pet_photo'])
+            return 200, dict(pet)
+
+    def delete_pet(self, pet_id, user):
+        with self.lock:
+            pet = self.pets.get(pet_id)
+            if pet is not None and pet['user_id'] == user:
+                del self.pets[pet_id]
+        return 200, ''
+
+    def update_pet(self, pet_id, form, user):
+        with self.lock:
+            pet = self.pets.get(pet_id)
+            if pet is None or pet['user_id'] != user:
+                return 400, self.error_page('400 Bad Request')
+            for field in ('name', 'animal_type', 'age'):
+                if field in form:
+                    pet[field] = form[field]
+            return 200, dict(pet)
+
+    @staticmethod
+    def photo_uri(photo) -> str:
+        if not photo:
+            return ''
+        return 'data:image/jpeg;base64,' + base64.b64encode(photo).decode('ascii')
+
+    @staticmethod
+    def read_form(environ) -> dict:
+        """Разбирает тело запроса в формате application/x-www-form-urlencoded или multipart/form-data.
+        Текстовые поля возвращаются строками, файлы - байтами"""
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else b''
+        content_type = environ.get('CONTENT_TYPE', '')
+        if content_type.startswith('multipart/form-data'):
+            message = BytesParser(policy=email.policy.HTTP).parsebytes(
+                b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+            form = {}
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                payload = part.get_payload(decode=True)
+                form[name] = payload if part.get_filename() else payload.decode('utf-8')
+            return form
+        return {name: values[0] for name, values in
+                parse_qs(body.decode('utf-8'), keep_blank_values=True).items()}
@@ -0,0 +1,123 @@
+import os
+import tracemalloc
+
+import pytest
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def rss_bytes():
+    """Текущий RSS процесса в байтах (psutil или /proc/self/statm), None - если узнать нельзя"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def open_fds():
+    """Число открытых файловых дескрипторов и сколько из них сокеты: (fds, sockets)"""
+    fd_dir = '/proc/self/fd'
+    if os.path.isdir(fd_dir):
+        fds = sockets = 0
+        for fd in os.listdir(fd_dir):
+            try:
+                target = os.readlink(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            fds += 1
+            sockets += target.startswith('socket:')
+        return fds, sockets
+    if psutil is not None:
+        process = psutil.Process()
+        fds = process.num_fds() if hasattr(process, 'num_fds') else process.num_handles()
+        return fds, len(process.connections(kind='all'))
+    return None, None
+
+
+def snapshot(trace: bool = True) -> dict:
+    fds, sockets = open_fds()
+    heap = None
+    if trace and tracemalloc.is_tracing():
+        # Память, занятую самими снимками tracemalloc, не учитываем
+        heap = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    return {'rss': rss_bytes(), 'fds': fds, 'sockets': sockets, 'tracemalloc': heap}
+
+
+def delta(before: dict, after: dict) -> dict:
+    result = {}
+    for key in ('rss', 'fds', 'sockets'):
+        result[key] = after[key] - before[key] if None not in (before[key], after[key]) else 0
+    result['heap'] = 0
+    result['top_allocations'] = []
+    if before['tracemalloc'] is not None and after['tracemalloc'] is not None:
+        stats = after['tracemalloc'].compare_to(before['tracemalloc'], 'lineno')
+        result['heap'] = sum(stat.size_diff for stat in stats)
+        result['top_allocations'] = [f'{stat.traceback}: {stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d})'
+                                     for stat in stats[:3] if stat.size_diff > 0]
+    return result
+
+
+class ResourceProfiler:
+    """Плагин pytest: снимает RSS, размер кучи Python (tracemalloc), число открытых файлов и сокетов
+    до и после каждого теста (вместе с фикстурами), печатает тесты с наибольшим приростом и отмечает
+    превысившие пороги. Подключается опцией --profile-resources (см. tests/conftest.py)"""
+
+    def __init__(self, rss_threshold: int = 5 * 1024 * 1024, fd_threshold: int = 1, socket_threshold: int = 1,
+                 top: int = 10, trace: bool = True):
+        self.thresholds = {'rss': rss_threshold, 'fds': fd_threshold, 'sockets': socket_threshold}
+        self.top = top
+        self.trace = trace
+        self.results = {}
+
+    @property
+    def leaks(self) -> dict:
+        """Тесты, превысившие хотя бы один порог: {nodeid: [описание]}"""
+        leaks = {}
+        for nodeid, result in self.results.items():
+            exceeded = [f'{key} {result[key]:+d}' for key, limit in self.thresholds.items() if result[key] >= limit]
+            if exceeded:
+                leaks[nodeid] = exceeded
+        return leaks
+
+    def pytest_sessionstart(self, session):
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def pytest_sessionfinish(self, session):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        before = snapshot(self.trace)
+        yield
+        self.results[item.nodeid] = delta(before, snapshot(self.trace))
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.results:
+            return
+        tr = terminalreporter
+        tr.section('профилирование ресурсов')
+        for key, title in (('rss', 'RSS, KiB'), ('heap', 'куча Python, KiB'), ('fds', 'открытые файлы'),
+                           ('sockets', 'открытые сокеты')):
+            growers = sorted(self.results.items(), key=lambda r: r[1][key], reverse=True)[:self.top]
+            growers = [(nodeid, r) for nodeid, r in growers if r[key] > 0]
+            if not growers:
+                continue
+            tr.write_line(f'Наибольший прирост - {title}:')
+            for nodeid, result in growers:
+                value = result[key] / 1024 if key in ('rss', 'heap') else result[key]
+                tr.write_line(f'  {value:+10.1f}  {nodeid}')
+                for line in result['top_allocations'] if key == 'heap' else []:
+                    tr.write_line(f'              {line}')
+        leaks = self.leaks
+        if leaks:
+            tr.write_line(f'Тесты с утечками выше порога ({len(leaks)}):', red=True)
+            for nodeid, exceeded in leaks.items():
+                tr.write_line(f'  {nodeid}: {", ".join(exceeded)}', red=True)
@@ -1,2 +1,9 @@
-valid_email = 'test227@gmail.com'
-valid_password = 'test227'
\ No newline at end of file
+import os
+
+# Учётные данные можно переопределить через переменные окружения, например у каждого
+# распределённого исполнителя (distributed.py) может быть свой пользователь
+valid_email = os.environ.get('PETFRIENDS_EMAIL', 'test227@gmail.com')
+valid_password = os.environ.get('PETFRIENDS_PASSWORD', 'test227')
+
+# Адрес бэкенда; например локальный прокси с внесением сбоев (faultproxy.py): http://127.0.0.1:8080/
+base_url = os.environ.get('PETFRIENDS_BASE_URL', 'https://petfriends1.herokuapp.com/')
@@ -0,0 +1,222 @@
+"""Длительный (soak) прогон сценария PetFriends с поиском деградации во времени.
+
+Несколько потоков в цикле выполняют смесь операций (ключ, создание, фото, обновление, удаление).
+Каждый интервал снимаются латентность, доля ошибок, память клиента и число соединений, в конце
+по интервалам ищется дрейф: рост латентности, ошибок, памяти или сокетов.
+
+    python soak.py --duration 7200 --interval 60 --workers 4 --report soak_report.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+from api import PetFriends
+from latency import percentile
+from profiling import open_fds, rss_bytes
+from settings import valid_email, valid_password
+from warmup import Warmup
+
+PHOTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'images', 'cat11.jpg')
+
+# Доли операций в сценарии. Удаление ровно столько же, сколько создание, чтобы аккаунт не рос
+DEFAULT_MIX = {'get_api_key': 1, 'add_new_pet_simple': 3, 'post_add_photo_pet': 2, 'update_pet_info': 2,
+               'delete_pet': 3}
+
+
+class SoakRunner:
+    """Выполняет сценарий в workers потоков в течение duration секунд и копит статистику по интервалам"""
+
+    def __init__(self, pf: PetFriends, duration: float, interval: float = 60, workers: int = 4,
+                 mix: dict = None, photo: str = PHOTO, seed: int = None):
+        self.pf = pf
+        self.duration = duration
+        self.interval = interval
+        self.workers = workers
+        self.mix = mix or DEFAULT_MIX
+        self.photo = photo
+        self.rng = random.Random(seed)
+        self.intervals = []
+        self._current = self._new_interval()
+        self._pets = []
+        self._busy = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._auth_key = None
+
+    @staticmethod
+    def _new_interval() -> dict:
+        return {'latencies': {}, 'calls': 0, 'errors': 0}
+
+    def _record(self, operation: str, seconds: float, ok: bool):
+        with self._lock:
+            self._current['latencies'].setdefault(operation, []).append(seconds)
+            self._current['calls'] += 1
+            self._current['errors'] += not ok
+
+    def _choose(self) -> tuple:
+        with self._lock:
+            operation = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+            # Без своих питомцев фото, обновление и удаление невозможны - сначала создаём
+            if operation in ('post_add_photo_pet', 'update_pet_info', 'delete_pet') and not self._pets:
+                operation = 'add_new_pet_simple'
+            pet_id = None
+            if operation == 'delete_pet':
+                # Не удаляем питомца, с которым сейчас работает другой поток, иначе его ошибка
+                # будет ложной деградацией сервера
+                free = [pet for pet in self._pets if not self._busy.get(pet)]
+                if free:
+                    pet_id = self.rng.choice(free)
+                    self._pets.remove(pet_id)
+                else:
+                    operation = 'add_new_pet_simple'
+            elif operation in ('post_add_photo_pet', 'update_pet_info'):
+                pet_id = self.rng.choice(self._pets)
+                self._busy[pet_id] = self._busy.get(pet_id, 0) + 1
+            return operation, pet_id
+
+    def _release(self, operation: str, pet_id: str):
+        if operation in ('post_add_photo_pet', 'update_pet_info'):
+            with self._lock:
+                self._busy[pet_id] -= 1
+                if not self._busy[pet_id]:
+                    del self._busy[pet_id]
+
+    def _call(self, operation: str, pet_id: str):
+        if operation == 'get_api_key':
+            status, result = self.pf.get_api_key(valid_email, valid_password)
+            if status == 200:
+                self._auth_key = result
+        elif operation == 'add_new_pet_simple':
+            status, result = self.pf.add_new_pet_simple(self._auth_key, 'Матюся', 'британец', '9')
+            if status == 200:
+                with self._lock:
+                    self._pets.append(result['id'])
+        elif operation == 'post_add_photo_pet':
+            status, _ = self.pf.post_add_photo_pet(self._auth_key, pet_id, self.photo)
+        elif operation == 'update_pet_info':
+            status, _ = self.pf.update_pet_info(self._auth_key, pet_id, 'Матюсище', 'двортерьер', 6)
+        else:
+            status, _ = self.pf.delete_pet(self._auth_key, pet_id)
+        return status == 200
+
+    def _worker(self):
+        while not self._stop.is_set():
+            operation, pet_id = self._choose()
+            started = time.perf_counter()
+            try:
+                ok = self._call(operation, pet_id)
+            except Exception:
+                ok = False
+            finally:
+                self._release(operation, pet_id)
+            self._record(operation, time.perf_counter() - started, ok)
+
+    def _close_interval(self, started: float):
+        fds, sockets = open_fds()
+        with self._lock:
+            current, self._current = self._current, self._new_interval()
+        latencies = [s for samples in current['latencies'].values() for s in samples]
+        self.intervals.append({
+            'elapsed': time.monotonic() - started,
+            'calls': current['calls'],
+            'error_rate': current['errors'] / current['calls'] if current['calls'] else 0.0,
+            'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+            'operations': {op: {'calls': len(s), 'p95': percentile(s, 95)} for op, s in current['latencies'].items()},
+            'rss': rss_bytes(), 'fds': fds, 'sockets': sockets,
+        })
+
+    def run(self) -> dict:
+        # Холодный старт бэкенда не должен попасть в первый интервал и выглядеть как улучшение со временем
+        warmup = Warmup(self.pf, connections=self.workers).run()
+        if warmup.error:
+            raise RuntimeError(str(warmup))
+        status, self._auth_key = self.pf.get_api_key(valid_email, valid_password)
+        if status != 200:
+            raise RuntimeError(f'Не удалось получить ключ API: {status} {self._auth_key}')
+        started = time.monotonic()
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while time.monotonic() - started < self.duration:
+                time.sleep(min(self.interval, max(self.duration - (time.monotonic() - started), 0)))
+                self._close_interval(started)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            self.cleanup()
+        return {'intervals': self.intervals, 'drift': detect_drift(self.intervals)}
+
+    def cleanup(self):
+        """Удаляет питомцев, созданных в сценарии и ещё не удалённых"""
+        for pet_id in self._pets:
+            self.pf.delete_pet(self._auth_key, pet_id)
+        self._pets = []
+
+
+def slope(values: list) -> float:
+    """Наклон прямой наименьших квадратов по точкам (0, v0), (1, v1), ..."""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x, mean_y = (n - 1) / 2, sum(values) / n
+    var_x = sum((x - mean_x) ** 2 for x in range(n))
+    return sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values)) / var_x
+
+
+def detect_drift(intervals: list, latency_growth: float = 0.25, error_growth: float = 0.02,
+                 rss_growth: int = 20 * 2 ** 20, socket_growth: int = 5) -> list:
+    """Ищет дрейф: сравнивает начало и конец прогона (по трети интервалов) и требует, чтобы тренд по
+    всем интервалам был в ту же сторону. Пороги: рост p95 на latency_growth (доля), доли ошибок на
+    error_growth, RSS на rss_growth байт, открытых сокетов на socket_growth"""
+    if len(intervals) < 3:
+        return []
+    third = max(len(intervals) // 3, 1)
+    findings = []
+
+    def check(key, title, threshold, relative=False, fmt=str):
+        values = [i[key] for i in intervals if i[key] is not None and i[key] == i[key]]
+        if len(values) < 3:
+            return
+        head, tail = sum(values[:third]) / third, sum(values[-third:]) / third
+        growth = (tail / head - 1) if relative and head else tail - head
+        if growth > threshold and slope(values) > 0:
+            findings.append(f'{title}: {fmt(head)} -> {fmt(tail)}')
+
+    check('p95', 'рост латентности p95', latency_growth, relative=True, fmt=lambda v: f'{v * 1000:.0f} мс')
+    check('error_rate', 'рост доли ошибок', error_growth, fmt=lambda v: f'{v:.1%}')
+    check('rss', 'рост памяти клиента (RSS)', rss_growth, fmt=lambda v: f'{v / 2 ** 20:.1f} МиБ')
+    check('sockets', 'рост числа открытых сокетов', socket_growth)
+    return findings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Длительный прогон сценария PetFriends с поиском деградации')
+    parser.add_argument('--duration', type=float, default=3600, help='длительность прогона, секунд')
+    parser.add_argument('--interval', type=float, default=60, help='интервал снятия статистики, секунд')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--report', default='soak_report.json')
+    args = parser.parse_args(argv)
+
+    report = SoakRunner(PetFriends(), args.duration, args.interval, args.workers, seed=args.seed).run()
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    for interval in report['intervals']:
+        print(f'{interval["elapsed"]:8.0f} с  вызовов {interval["calls"]:6d}  ошибок {interval["error_rate"]:6.1%}  '
+              f'p95 {interval["p95"] * 1000:7.0f} мс  RSS {(interval["rss"] or 0) / 2 ** 20:6.1f} МиБ  '
+              f'сокетов {interval["sockets"]}')
+    if report['drift']:
+        print('Обнаружена деградация:\n  ' + '\n  '.join(report['drift']))
+        return 1
+    print('Деградации не обнаружено')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""Табличные (data-driven) тест-кейсы API PetFriends.
+
+Кейсы описываются в YAML или JSON (tests/specs/*.yaml): метод PetFriends, контекст авторизации,
+таблица входных данных (декартово произведение значений) и ожидаемый результат. Спецификация
+один раз компилируется в план выполнения: кейсы группируются по методу и авторизации и выполняются
+пачками параллельно через общий клиент, а pytest получает по элементу на кейс (см. tests/conftest.py).
+"""
+import itertools
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from api import PetFriends
+from settings import valid_email, valid_password
+from warmup import session_auth_key
+
+INVALID_KEY = {'key': 'ksa344ldld'}
+
+
+def is_age_valid(age) -> bool:
+    # Возраст - целое число от 1 до 49
+    age = str(age)
+    return age.isdigit() and 0 < int(age) < 50
+
+
+# Предусловия для setup: что должно существовать до выполнения кейса
+SETUPS = ('my_pet',)
+
+# Условия для invalid_when: при каком наборе входных данных кейс ожидает expect_invalid вместо expect
+PREDICATES = {
+    'pet_fields_invalid': lambda inputs: inputs['name'] == '' or inputs['animal_type'] == ''
+                                         or not is_age_valid(inputs['age']),
+}
+
+
+class Case:
+    """Один развёрнутый тест-кейс спецификации"""
+
+    def __init__(self, case_id: str, endpoint: str, auth: str, inputs: dict, expect: dict, concurrent: bool = True,
+                 setup: tuple = ()):
+        self.id = case_id
+        self.endpoint = endpoint
+        self.auth = auth
+        self.inputs = inputs
+        self.expect = expect
+        self.concurrent = concurrent
+        self.setup = tuple(setup)
+
+    @property
+    def group(self) -> tuple:
+        return self.endpoint, self.auth
+
+
+def load_spec(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            return json.load(f)
+        if yaml is None:
+            raise ImportError(f'Для спецификации {path} необходима библиотека PyYAML: pip install pyyaml')
+        return yaml.safe_load(f)
+
+
+def build_values(raw: dict, base_dir: str) -> dict:
+    """Именованные значения спецификации: строки, {repeat: 'x', times: 255} и {file: путь от файла спецификации}.
+    Значения $valid_email и $valid_password (пользователь из settings.py) доступны всегда"""
+    values = {'valid_email': valid_email, 'valid_password': valid_password}
+    for name, value in (raw or {}).items():
+        if isinstance(value, dict) and 'repeat' in value:
+            value = value['repeat'] * value['times']
+        elif isinstance(value, dict) and 'file' in value:
+            value = os.path.normpath(os.path.join(base_dir, value['file']))
+        values[name] = value
+    return values
+
+
+def resolve(value, values: dict):
+    """Подставляет именованное значение вместо ссылки вида $name. Ссылки $my_pet и $new_pet
+    разрешаются при выполнении (см. ExecutionPlan)"""
+    if isinstance(value, str) and value.startswith('$') and value[1:] in values:
+        return values[value[1:]]
+    return value
+
+
+def compile_spec(spec: dict, base_dir: str = '.') -> list:
+    """Разворачивает группы кейсов спецификации в список Case. В matrix каждое поле - словарь
+    {id: значение}, список значений или одно значение; кейсы - декартово произведение полей.
+    setup - предусловия кейсов группы (см. SETUPS), например [my_pet] - у пользователя есть питомец"""
+    values = build_values(spec.get('values'), base_dir)
+    cases = []
+    for group in spec['cases']:
+        for name in group.get('setup', []):
+            if name not in SETUPS:
+                raise ValueError(f'Группа {group["id"]}: неизвестное предусловие {name!r}, '
+                                 f'доступны: {", ".join(SETUPS)}')
+        fixed = {name: resolve(value, values) for name, value in group.get('inputs', {}).items()}
+        axes = []
+        for name, options in group.get('matrix', {}).items():
+            if isinstance(options, dict):
+                options = list(options.items())
+            elif isinstance(options, list):
+                options = [(str(value), value) for value in options]
+            else:
+                options = [(str(options), options)]
+            axes.append([(name, option_id, resolve(value, values)) for option_id, value in options])
+        predicate = PREDICATES[group['invalid_when']] if 'invalid_when' in group else None
+        for combination in itertools.product(*axes):
+            inputs = dict(fixed, **{name: value for name, _, value in combination})
+            case_id = group['id'] + (f'[{"-".join(option_id for _, option_id, _ in combination)}]'
+                                     if combination else '')
+            expect = group['expect_invalid'] if predicate and predicate(inputs) else group['expect']
+            cases.append(Case(case_id, group['endpoint'], group.get('auth', 'valid'), inputs, expect,
+                              group.get('concurrent', True), group.get('setup', ())))
+    return cases
+
+
+class ExecutionPlan:
+    """План выполнения: кейсы упорядочены по группам (метод, авторизация) и выполняются пачками
+    по batch_size через один клиент PetFriends. Результат пачки вычисляется при первом обращении
+    к любому её кейсу. Пачки составляются только из выбранных кейсов (см. select)"""
+
+    def __init__(self, cases: list, pf: PetFriends = None, batch_size: int = 50, workers: int = 8,
+                 credentials: tuple = (valid_email, valid_password)):
+        self.batch_size = batch_size
+        self.select(cases)
+        self.workers = workers
+        self.credentials = credentials
+        self.results = {}
+        self.created = []
+        self._pf = pf
+        self._auth_key = None
+        self._my_pet = None
+        self._lock = threading.Lock()
+        self._my_pet_lock = threading.Lock()
+
+    def select(self, cases: list):
+        """Оставляет в плане только cases, например тесты, выбранные pytest (-k, id узлов, пачка
+        распределённого исполнителя): остальные кейсы не попадают ни в одну пачку и не выполняются"""
+        order = {}
+        for case in cases:
+            order.setdefault(case.group, []).append(case)
+        self.cases = [case for group in order.values() for case in group]
+        self.batches = {}
+        for group in order.values():
+            for start in range(0, len(group), self.batch_size):
+                batch = group[start:start + self.batch_size]
+                for case in batch:
+                    self.batches[case.id] = batch
+
+    @property
+    def pf(self) -> PetFriends:
+        # Клиент создаётся лениво, чтобы сбор тестов не обращался к сети
+        if self._pf is None:
+            self._pf = PetFriends()
+        return self._pf
+
+    @property
+    def auth_key(self) -> dict:
+        if self._auth_key is None:
+            self._auth_key = session_auth_key(self.pf, self.credentials)
+        if self._auth_key is None:
+            status, key = self.pf.get_api_key(*self.credentials)
+            if status != 200:
+                raise RuntimeError(f'Не удалось получить ключ API: {status} {key}')
+            self._auth_key = key
+        return self._auth_key
+
+    def _new_pet(self) -> str:
+        _, pet = self.pf.add_new_pet_simple(self.auth_key, 'Матюся', 'британец', '9')
+        with self._lock:
+            self.created.append(pet['id'])
+        return pet['id']
+
+    def my_pet(self) -> str:
+        with self._my_pet_lock:
+            if self._my_pet is None:
+                self._my_pet = self._new_pet()
+        return self._my_pet
+
+    def _prepare(self, case: Case) -> tuple:
+        """Выполняет предусловия кейса, подставляет ключ авторизации и питомцев ($my_pet - общий питомец,
+        $new_pet - новый на кейс)"""
+        if 'my_pet' in case.setup:
+            self.my_pet()
+        inputs = dict(case.inputs)
+        for name, value in inputs.items():
+            if value == '$my_pet':
+                inputs[name] = self.my_pet()
+            elif value == '$new_pet':
+                inputs[name] = self._new_pet()
+        if case.auth == 'valid':
+            auth_key = self.auth_key
+        elif case.auth == 'invalid':
+            auth_key = INVALID_KEY
+        else:
+            auth_key = None
+        return auth_key, inputs
+
+    def _execute(self, case: Case) -> tuple:
+        try:
+            auth_key, inputs = self._prepare(case)
+            method = getattr(self.pf, case.endpoint)
+            status, result = method(**inputs) if auth_key is None else method(auth_key, **inputs)
+            return status, result, inputs, None
+        except Exception as e:
+            return None, None, case.inputs, e
+
+    def result(self, case: Case) -> tuple:
+        """(status, result, inputs, исключение) кейса; при первом обращении выполняется вся его пачка"""
+        with self._lock:
+            done = case.id in self.results
+        if not done:
+            batch = [c for c in self.batches.get(case.id, [case]) if c.id not in self.results]
+            if case.concurrent and len(batch) > 1:
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    outcomes = list(pool.map(self._execute, batch))
+            else:
+                outcomes = [self._execute(c) for c in batch]
+            with self._lock:
+                for c, outcome in zip(batch, outcomes):
+                    self.results.setdefault(c.id, outcome)
+        return self.results[case.id]
+
+    def check(self, case: Case) -> list:
+        """Список расхождений с ожидаемым результатом (пустой - кейс прошёл)"""
+        status, result, inputs, error = self.result(case)
+        if error is not None:
+            return [f'исключение при выполнении: {type(error).__name__}: {error}']
+        expect = case.expect
+        problems = []
+        expected_status = expect.get('status')
+        if expected_status is not None and status not in (expected_status if isinstance(expected_status, list)
+                                                          else [expected_status]):
+            problems.append(f'код ответа {status}, ожидался {expected_status}')
+        for field in expect.get('echo', []):
+            if not isinstance(result, dict) or result.get(field) != str(inputs[field]):
+                actual = result.get(field) if isinstance(result, dict) else result
+                problems.append(f'поле {field}: {str(actual)[:80]!r}, ожидалось {str(inputs[field])[:80]!r}')
+        for field, value in expect.get('fields', {}).items():
+            # $name в ожидаемом значении - значение входного поля name (например $pet_id)
+            if isinstance(value, str) and value.startswith('$') and value[1:] in inputs:
+                value = inputs[value[1:]]
+            if not isinstance(result, dict) or result.get(field) != value:
+                problems.append(f'поле {field}: {result.get(field) if isinstance(result, dict) else result!r}, '
+                                f'ожидалось {value!r}')
+        if 'contains' in expect and expect['contains'] not in str(result):
+            problems.append(f'в ответе нет {expect["contains"]!r}')
+        if 'not_contains' in expect and expect['not_contains'] in (result if isinstance(result, (dict, str)) else ''):
+            problems.append(f'в ответе есть {expect["not_contains"]!r}')
+        if 'nonempty' in expect and not (isinstance(result, dict) and result.get(expect['nonempty'])):
+            problems.append(f'пустой список {expect["nonempty"]!r}')
+        return problems
+
+    def cleanup(self):
+        """Удаляет питомцев, созданных планом для кейсов с $my_pet и $new_pet"""
+        if self._auth_key is None:
+            return
+        for pet_id in self.created:
+            self.pf.delete_pet(self._auth_key, pet_id)
+        self.created = []
+        self._my_pet = None
+
+
+class SpecFailure(Exception):
+    pass
+
+
+class SpecFile(pytest.File):
+    """Файл спецификации как модуль pytest: по элементу SpecItem на каждый развёрнутый кейс"""
+
+    def collect(self):
+        cases = compile_spec(load_spec(str(self.path)), str(self.path.parent))
+        self.plan = ExecutionPlan(cases)
+        for case in self.plan.cases:
+            item = SpecItem.from_parent(self, name=case.id, case=case)
+            # Клиент плана по умолчанию ходит на настоящий бэкенд
+            item.add_marker('network')
+            yield item
+
+    def teardown(self):
+        self.plan.cleanup()
+
+
+def select_items(items: list):
+    """Перестраивает планы файлов спецификаций по элементам, которые pytest действительно выполнит"""
+    selected = {}
+    for item in items:
+        if isinstance(item, SpecItem):
+            selected.setdefault(item.parent, []).append(item.case)
+    for spec_file, cases in selected.items():
+        spec_file.plan.select(cases)
+
+
+class SpecItem(pytest.Item):
+    def __init__(self, *, case: Case, **kwargs):
+        super().__init__(**kwargs)
+        self.case = case
+
+    def runtest(self):
+        problems = self.parent.plan.check(self.case)
+        if problems:
+            raise SpecFailure(problems)
+
+    def repr_failure(self, excinfo):
+        if isinstance(excinfo.value, SpecFailure):
+            return f'{self.case.endpoint} {self.case.id}:\n  ' + '\n  '.join(excinfo.value.args[0])
+        return super().repr_failure(excinfo)
+
+    def reportinfo(self):
+        return self.path, None, f'{self.case.endpoint}: {self.name}'
@@ -0,0 +1,148 @@
+import abc
+import time
+import uuid
+from urllib.parse import quote, quote_from_bytes
+
+
+def is_streamable(value) -> bool:
+    """Значение поля, которое нужно отправлять потоком: файлоподобный объект или генератор/итератор блоков"""
+    return hasattr(value, 'read') or (hasattr(value, '__iter__') and not isinstance(value, (str, bytes, bytearray,
+                                                                                          tuple, list, dict)))
+
+
+def generate_stream(size: int, pattern: bytes = b'x', chunk_size: int = 64 * 1024):
+    """Генератор блоков общего размера size байт - тело любого размера без выделения памяти под него целиком"""
+    block = (pattern * (chunk_size // len(pattern) + 1))[:chunk_size]
+    sent = 0
+    while sent < size:
+        chunk = block[:min(chunk_size, size - sent)]
+        sent += len(chunk)
+        yield chunk
+
+
+def iter_value(value, chunk_size: int = 64 * 1024):
+    """Блоки значения поля: строки и байты целиком, файлы - по chunk_size, итераторы - как есть"""
+    if isinstance(value, str):
+        yield value.encode('utf-8')
+    elif isinstance(value, (bytes, bytearray)):
+        yield bytes(value)
+    elif hasattr(value, 'read'):
+        while True:
+            chunk = value.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+    elif hasattr(value, '__iter__'):
+        for chunk in value:
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+    else:
+        yield str(value).encode('utf-8')
+
+
+class UploadStats:
+    """Статистика потоковой отправки тела: сколько байт ушло, за какое время, скорость и, если
+    сервер оборвал соединение раньше, - после скольких байт и секунд это произошло"""
+
+    def __init__(self):
+        self.bytes_sent = 0
+        self.started = None
+        self.finished = None
+        self.aborted = None
+        self.error = ''
+
+    def sent(self, size: int):
+        if self.started is None:
+            self.started = time.perf_counter()
+        self.bytes_sent += size
+
+    def complete(self):
+        self.finished = time.perf_counter()
+
+    def abort(self, reason: str):
+        self.aborted = time.perf_counter()
+        self.error = reason
+
+    @property
+    def completed(self) -> bool:
+        return self.finished is not None and self.aborted is None
+
+    @property
+    def duration(self) -> float:
+        end = self.aborted or self.finished or time.perf_counter()
+        return end - self.started if self.started is not None else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Скорость отправки, байт в секунду"""
+        return self.bytes_sent / self.duration if self.duration else 0.0
+
+    def as_dict(self) -> dict:
+        return {'bytes_sent': self.bytes_sent, 'duration': self.duration, 'throughput': self.throughput,
+                'completed': self.completed, 'aborted_after_bytes': self.bytes_sent if self.aborted else None,
+                'aborted_after_seconds': self.duration if self.aborted else None, 'error': self.error}
+
+    def __str__(self):
+        text = f'{self.bytes_sent / 2 ** 20:.1f} МиБ за {self.duration:.2f} с ({self.throughput / 2 ** 20:.1f} МиБ/с)'
+        if self.aborted:
+            text += f', сервер оборвал соединение: {self.error}'
+        return text
+
+
+class _StreamingBody(abc.ABC):
+    """Тело запроса, которое отдаётся транспорту блоками через итерацию. У тела нет длины,
+    поэтому requests, urllib3 и httpx отправляют его с Transfer-Encoding: chunked"""
+
+    content_type = ''
+
+    def __init__(self, fields: dict, chunk_size: int = 64 * 1024):
+        self.fields = fields
+        self.chunk_size = chunk_size
+        self.stats = UploadStats()
+
+    @abc.abstractmethod
+    def _chunks(self):
+        """Генератор блоков тела в байтах"""
+
+    def __iter__(self):
+        for chunk in self._chunks():
+            if chunk:
+                self.stats.sent(len(chunk))
+                yield chunk
+        self.stats.complete()
+
+
+class StreamingMultipart(_StreamingBody):
+    """multipart/form-data как у MultipartEncoder, но значения полей читаются потоком. Значение поля -
+    строка, байты, файл, генератор блоков или кортеж (имя файла, значение, content-type)"""
+
+    def __init__(self, fields: dict, boundary: str = None, chunk_size: int = 64 * 1024):
+        super().__init__(fields, chunk_size)
+        self.boundary = boundary or uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+
+    def _chunks(self):
+        for name, value in self.fields.items():
+            disposition = f'form-data; name="{name}"'
+            content_type = ''
+            if isinstance(value, tuple):
+                filename, value, content_type = (value + ('application/octet-stream',))[:3]
+                disposition += f'; filename="{filename}"'
+            header = f'--{self.boundary}\r\nContent-Disposition: {disposition}\r\n'
+            if content_type:
+                header += f'Content-Type: {content_type}\r\n'
+            yield (header + '\r\n').encode('utf-8')
+            yield from iter_value(value, self.chunk_size)
+            yield b'\r\n'
+        yield f'--{self.boundary}--\r\n'.encode('utf-8')
+
+
+class StreamingForm(_StreamingBody):
+    """application/x-www-form-urlencoded, где значения полей кодируются и отправляются по блокам"""
+
+    content_type = 'application/x-www-form-urlencoded'
+
+    def _chunks(self):
+        for n, (name, value) in enumerate(self.fields.items()):
+            yield (('&' if n else '') + quote(str(name), safe='') + '=').encode('ascii')
+            for chunk in iter_value(value, self.chunk_size):
+                yield quote_from_bytes(chunk, safe='').encode('ascii')
@@ -0,0 +1,152 @@
+from api import PetFriends
+from distributed import RESULTS_FILE_ENV
+from journal import collect_garbage, default_journal
+from latency import Baselines, DEFAULT_BASELINES, LatencyRecorder, check_budgets
+from petfriends_stub import PetFriendsStub
+from profiling import ResourceProfiler
+from settings import valid_email, valid_password
+from spec_engine import SpecFile, select_items
+from transport import WSGITransport
+from warmup import session_warmup, start_session_warmup
+import os
+import warnings
+import pytest
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('latency', 'Бюджеты латентности PetFriends')
+    group.addoption('--latency-baselines', default=DEFAULT_BASELINES, help='файл с эталонными значениями латентности')
+    group.addoption('--latency-update-baselines', action='store_true',
+                    help='записать замеры текущего прогона как новые эталоны')
+    group.addoption('--latency-tolerance', type=float, default=0.2,
+                    help='допустимый рост перцентилей относительно эталона (0.2 = +20%%)')
+    group.addoption('--latency-warn-only', action='store_true',
+                    help='не валить тесты при превышении бюджета, а только предупреждать')
+    group = parser.getgroup('profiling', 'Профилирование памяти и дескрипторов')
+    group.addoption('--profile-resources', action='store_true',
+                    help='замерять RSS, кучу, открытые файлы и сокеты до и после каждого теста')
+    group.addoption('--profile-rss-threshold', type=float, default=5.0,
+                    help='прирост RSS за тест (МиБ), начиная с которого тест считается утекающим')
+    group.addoption('--profile-fd-threshold', type=int, default=1,
+                    help='прирост открытых файлов/сокетов за тест, начиная с которого тест считается утекающим')
+    group.addoption('--profile-top', type=int, default=10, help='сколько тестов с наибольшим приростом показывать')
+    group = parser.getgroup('warmup', 'Прогрев бэкенда PetFriends')
+    group.addoption('--no-warmup', action='store_true',
+                    help='не будить бэкенд и не открывать соединения заранее перед тестами с маркером network')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'latency_budget(action="fail", samples=20, warmup=3, outlier_k=3.0, '
+                                       '**budgets): бюджеты латентности методов PetFriends, например '
+                                       'get_list_of_pets={"p95": 0.8} (в секундах)')
+    config.addinivalue_line('markers', 'network: тест обращается к настоящему бэкенду PetFriends (для него '
+                                       'бэкенд прогревается заранее)')
+    if config.getoption('--profile-resources'):
+        config.pluginmanager.register(ResourceProfiler(
+            rss_threshold=int(config.getoption('--profile-rss-threshold') * 1024 * 1024),
+            fd_threshold=config.getoption('--profile-fd-threshold'),
+            socket_threshold=config.getoption('--profile-fd-threshold'),
+            top=config.getoption('--profile-top')), 'resource_profiler')
+
+
+def pytest_sessionstart(session):
+    # Уборка питомцев - в хуках сессии, а не в autouse-фикстуре: фикстуры не применяются к элементам,
+    # которые не являются функциями (например табличные кейсы SpecItem)
+    _collect_orphaned_pets()
+
+
+def pytest_sessionfinish(session):
+    _collect_orphaned_pets()
+
+
+def pytest_terminal_summary(terminalreporter):
+    warmup = session_warmup()
+    if warmup is not None:
+        terminalreporter.write_line(str(warmup))
+
+
+def pytest_collect_file(file_path, parent):
+    # Табличные кейсы из tests/specs/*.yaml и *.json (см. spec_engine.py)
+    if file_path.parent.name == 'specs' and file_path.suffix in ('.yaml', '.yml', '.json'):
+        return SpecFile.from_parent(parent, path=file_path)
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(session, config, items):
+    # После -k, -m и выбора по id узлов: табличные кейсы выполняются пачками только из выбранных
+    select_items(items)
+    # Прогрев идёт в фоне, пока выполняются первые тесты; ключ API из него берут табличные кейсы.
+    # Не нужен, если выбраны только тесты без сети, при --collect-only (так собирает кейсы координатор
+    # distributed.py) и в пачках распределённого исполнителя - тот запускает pytest на каждую пачку,
+    # и прогрев каждый раз начинался бы заново
+    if (not config.getoption('--no-warmup') and not config.option.collectonly
+            and not os.environ.get(RESULTS_FILE_ENV) and any(item.get_closest_marker('network') for item in items)):
+        start_session_warmup(PetFriends())
+
+
+def _collect_orphaned_pets():
+    """Удаляет питомцев из журнала, которые остались неудалёнными в этой сессии или после завершившихся
+    (в том числе упавших) процессов. Питомцы других идущих сессий не трогаются"""
+    journal = default_journal()
+    if journal is None:
+        return
+    pf = PetFriends(journal=journal)
+    if not journal.orphaned(pf.base_url):
+        return
+    try:
+        _, auth_key = pf.get_api_key(valid_email, valid_password)
+        deleted = collect_garbage(pf, journal, auth_key if isinstance(auth_key, dict) else None)
+        print(f'\nУдалено питомцев, созданных тестами: {deleted}')
+    except Exception as e:
+        warnings.warn(f'Не удалось удалить питомцев из журнала {journal.path}: {e}')
+
+
+@pytest.fixture()
+def stub():
+    """PetFriendsStub с пользователем из settings.py: бэкенд в памяти, без сети"""
+    return PetFriendsStub({valid_email: valid_password})
+
+
+@pytest.fixture()
+def stub_pf(stub):
+    """Фабрика клиентов PetFriends на заглушке stub: stub_pf() - клиент на http://petfriends.local/,
+    host - свой адрес (например, чтобы не пересекалось состояние прогрева), wrap - обёртка над транспортом
+    (transport -> transport), journal - журнал созданных питомцев (по умолчанию не ведётся)"""
+    def make(host: str = 'petfriends.local', wrap=None, journal=None) -> PetFriends:
+        transport = WSGITransport(stub)
+        return PetFriends(f'http://{host}/', wrap(transport) if wrap else transport, journal=journal)
+    return make
+
+
+@pytest.fixture(scope='session')
+def latency_baselines(request):
+    baselines = Baselines(request.config.getoption('--latency-baselines'))
+    yield baselines
+    if request.config.getoption('--latency-update-baselines'):
+        baselines.save()
+
+
+@pytest.fixture()
+def latency_budget(request, latency_baselines):
+    """Замер латентности в тесте: recorder.measure(pf.get_list_of_pets, key, '') или recorder.watch(pf).
+    После теста замеры сверяются с бюджетами из маркера latency_budget и с сохранёнными эталонами"""
+    marker = request.node.get_closest_marker('latency_budget')
+    options = dict(marker.kwargs) if marker else {}
+    action = options.pop('action', 'fail')
+    outlier_k = options.pop('outlier_k', 3.0)
+    recorder = LatencyRecorder(options.pop('samples', 20), options.pop('warmup', 3))
+    yield recorder
+    summaries, problems = check_budgets(recorder, options, outlier_k)
+    config = request.config
+    for name, summary in summaries.items():
+        key = f'{request.node.nodeid}::{name}'
+        problems += latency_baselines.compare(key, summary, config.getoption('--latency-tolerance'))
+        if config.getoption('--latency-update-baselines'):
+            latency_baselines.update(key, summary)
+        # Холодные замеры в бюджет не входят, но попадают в отчёт (например --junitxml)
+        request.node.user_properties.append((f'latency::{name}', summary))
+    if problems:
+        if action == 'warn' or config.getoption('--latency-warn-only'):
+            warnings.warn('Превышение латентности:\n' + '\n'.join(problems))
+        else:
+            pytest.fail('Превышение латентности:\n' + '\n'.join(problems), pytrace=False)
@@ -0,0 +1,32 @@
+from compression import decode_chunks, decode_content, accept_encoding
+from settings import valid_email, valid_password
+import gzip
+import zlib
+import pytest
+
+
+@pytest.mark.parametrize("encoding, compress", [('gzip', gzip.compress), ('deflate', zlib.compress),
+                                                ('', lambda data: data)], ids=['gzip', 'deflate', 'identity'])
+def test_decode_content(encoding, compress):
+    """Распаковка по Content-Encoding совпадает с исходными данными, в том числе при потоковой подаче блоков"""
+    data = b'{"pets": []}' * 1000
+    assert decode_content(compress(data), encoding) == data
+    packed = compress(data)
+    chunks = [packed[i:i + 7] for i in range(0, len(packed), 7)]
+    assert b''.join(decode_chunks(chunks, encoding)) == data
+
+
+def test_list_of_pets_transfer_stats(stub_pf):
+    """Список питомцев запрашивается со сжатием, а в transfer_stats видны сжатый и распакованный размеры"""
+    pf = stub_pf()
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    for _ in range(20):
+        pf.add_new_pet_simple(auth_key, 'Матюся', 'британец', '9')
+    status, result = pf.get_list_of_pets(auth_key, '')
+    assert status == 200
+    assert len(result['pets']) == 20
+    assert 'gzip' in accept_encoding()
+    assert pf.transfer_stats.last['encoding'] == 'gzip'
+    assert pf.transfer_stats.last['wire_bytes'] < pf.transfer_stats.last['content_bytes']
+    assert pf.transfer_stats.endpoints['api/pets']['calls'] == 1
+    assert pf.transfer_stats.ratio > 1
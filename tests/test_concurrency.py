@@ -0,0 +1,83 @@
+from api import PetFriends
+from concurrency import AdaptiveLimiter
+from transport import Response
+from settings import valid_email, valid_password
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+
+class SlowServer:
+    """Транспорт с заданным временем ответа и кодом, который запоминает максимум одновременных запросов"""
+
+    def __init__(self, delay: float = 0.002, status: int = 200):
+        self.delay = delay
+        self.status = status
+        self.inflight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def request(self, method, url, headers=None, params=None, data=None):
+        with self.lock:
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.inflight -= 1
+        return Response(self.status, {}, b'{}')
+
+
+def run(pf, calls: int, workers: int = 16):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda _: pf.transport.request('GET', pf.base_url), range(calls)))
+
+
+def test_limit_grows_while_latency_is_stable():
+    """При стабильной латентности лимит растёт, но запросов в полёте не больше лимита"""
+    server = SlowServer()
+    limiter = AdaptiveLimiter(initial=2, max_limit=8, tolerance=100)
+    pf = limiter.wrap(PetFriends('http://petfriends.local/', server, journal=None))
+    run(pf, 300)
+    metrics = limiter.metrics()
+    assert metrics['limit'] == 8
+    assert metrics['completed'] == 300
+    assert metrics['inflight'] == 0
+    assert metrics['throughput'] > 0
+    assert server.peak <= 8
+    assert [int(limit) for _, limit in limiter.history][:2] == [2, 3]
+
+
+def test_initial_limit_is_clamped():
+    """Начальный лимит не выходит за [min_limit, max_limit], например при --workers 2"""
+    assert AdaptiveLimiter(initial=4, max_limit=2).metrics()['limit'] == 2
+    assert AdaptiveLimiter(initial=0, min_limit=1).metrics()['limit'] == 1
+
+
+def test_backoff_on_overload_and_latency_growth():
+    """503 снижает лимит мультипликативно, рост латентности - по градиенту"""
+    limiter = AdaptiveLimiter(initial=16, backoff=0.5)
+    pf = limiter.wrap(PetFriends('http://petfriends.local/', SlowServer(status=503), journal=None))
+    run(pf, 50, workers=4)
+    assert limiter.metrics()['limit'] == 1
+    assert limiter.errors == 50
+
+    limiter = AdaptiveLimiter(initial=16)
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(0.01)
+    assert int(limiter.limit) == 16
+    for _ in range(50):
+        limiter.acquire()
+        limiter.release(0.1)
+    assert int(limiter.limit) < 16
+
+
+def test_wrapped_pet_friends_in_process(stub_pf):
+    """Методы PetFriends работают через ограничитель как обычно"""
+    limiter = AdaptiveLimiter()
+    pf = limiter.wrap(stub_pf())
+    status, auth_key = pf.get_api_key(valid_email, valid_password)
+    assert status == 200
+    status, _ = pf.get_list_of_pets(auth_key, '')
+    assert status == 200
+    assert limiter.completed == 2
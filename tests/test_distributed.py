@@ -0,0 +1,66 @@
+from distributed import Coordinator, CollectionError, CoordinatorServer, call, collect_cases, run_batch, run_worker
+import threading
+import pytest
+
+TOKEN = 'test-token'
+
+
+@pytest.fixture()
+def coordinator_address():
+    """Координатор на свободном локальном порту со всеми кейсами из test_parametrize_mark.py"""
+    cases = collect_cases(['tests/test_parametrize_mark.py'])
+    coordinator = Coordinator(cases, batch_size=2)
+    server = CoordinatorServer(coordinator, '127.0.0.1', 0, TOKEN)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield coordinator, server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_workers_merge_results(coordinator_address):
+    """Два исполнителя разбирают очередь, в сводном отчёте есть результат каждого кейса"""
+    coordinator, address = coordinator_address
+    workers = [threading.Thread(target=run_worker, args=(address, f'worker-{n}'),
+                                kwargs={'poll': 0.1, 'token': TOKEN}) for n in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+    report = coordinator.report()
+    assert report['summary'] == {'passed': 6}
+    assert sum(report['workers'].values()) == 6
+    assert [r['nodeid'] for r in report['results']] == [c for batch in coordinator.batches.values() for c in batch]
+
+
+def test_expired_lease_is_reissued():
+    """Пачка, за которую исполнитель не отчитался вовремя, отдаётся другому, повторный ответ игнорируется"""
+    coordinator = Coordinator(['a::t1', 'a::t2'], batch_size=2, lease=-1)
+    first = coordinator.pull('w1')
+    second = coordinator.pull('w2')
+    assert first['batch'] == second['batch'] == 0
+    coordinator.submit('w2', 0, [{'nodeid': 'a::t1', 'outcome': 'passed'}, {'nodeid': 'a::t2', 'outcome': 'failed'}])
+    coordinator.submit('w1', 0, [{'nodeid': 'a::t1', 'outcome': 'failed'}, {'nodeid': 'a::t2', 'outcome': 'failed'}])
+    assert coordinator.pull('w1') == {'op': 'done'}
+    assert coordinator.report()['summary'] == {'passed': 1, 'failed': 1}
+
+
+def test_wrong_token_is_rejected(coordinator_address):
+    """Без общего токена координатор не выдаёт пачки"""
+    coordinator, address = coordinator_address
+    with pytest.raises(RuntimeError, match='неверный токен'):
+        call(address, {'op': 'pull', 'worker': 'intruder'}, 'wrong')
+    assert coordinator.leased == {}
+
+
+def test_collection_errors_are_reported(tmp_path):
+    """Модуль, который не собрался, не пропадает из прогона молча"""
+    broken = tmp_path / 'test_broken.py'
+    broken.write_text('def test_broken(:\n    pass\n')
+    with pytest.raises(CollectionError, match='test_broken.py'):
+        collect_cases([str(broken)])
+
+
+def test_cases_cannot_be_options():
+    """Кейс от координатора не может стать опцией командной строки pytest"""
+    with pytest.raises(ValueError):
+        run_batch(['-p', 'evil_plugin'], {})
@@ -0,0 +1,87 @@
+from api import PetFriends
+from faultproxy import FaultProfile, FaultProxy, parse_latency
+from transport import RequestsTransport, WSGITransport
+from settings import valid_email, valid_password
+import os
+import random
+import time
+import pytest
+import requests
+
+# Прокси поднимается на 127.0.0.1 перед PetFriendsStub, так что сеть не нужна
+
+PHOTO = os.path.join(os.path.dirname(__file__), 'images', 'cat11.jpg')
+
+
+def proxy(stub, **profile) -> FaultProxy:
+    return FaultProxy('http://petfriends.local/', FaultProfile(seed=1, **profile), WSGITransport(stub))
+
+
+def test_parse_latency():
+    rng = random.Random(1)
+    assert parse_latency('0.25')(rng) == 0.25
+    assert 0.1 <= parse_latency('uniform:0.1,0.2')(rng) <= 0.2
+    assert parse_latency('pareto:0.1,1.5')(rng) >= 0.1
+    samples = sorted(parse_latency('lognormal:0.2,0.5')(rng) for _ in range(1001))
+    assert samples[500] == pytest.approx(0.2, rel=0.15)
+    with pytest.raises(ValueError):
+        parse_latency('poisson:1')
+
+
+def test_proxy_passes_requests_through(stub):
+    """Без сбоев прокси прозрачен: ключ, создание питомца, список и удаление"""
+    with proxy(stub) as server:
+        pf = PetFriends(server.url, RequestsTransport(), journal=None)
+        status, auth_key = pf.get_api_key(valid_email, valid_password)
+        assert status == 200
+        status, pet = pf.add_new_pet_simple(auth_key, 'Матюся', 'британец', '9')
+        assert status == 200
+        assert pet['name'] == 'Матюся'
+        status, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
+        assert [p['id'] for p in my_pets['pets']] == [pet['id']]
+        status, _ = pf.delete_pet(auth_key, pet['id'])
+        assert status == 200
+        assert server.stats == {'requests': 4, 'reset': 0, 'error_page': 0, 'truncate': 0, 'upstream_error': 0}
+
+
+def test_error_page_falls_back_to_text(stub):
+    """На HTML-странице ошибки каждый метод PetFriends возвращает код и текст вместо JSON"""
+    with proxy(stub, error_page=1.0) as server:
+        pf = PetFriends(server.url, RequestsTransport(), journal=None)
+        key = {'key': 'any'}
+        calls = [pf.get_api_key(valid_email, valid_password), pf.get_list_of_pets(key, ''),
+                 pf.add_new_pet_simple(key, 'Матюся', 'британец', '9'),
+                 pf.add_new_pet_with_photo(key, 'Матюся', 'британец', '9', PHOTO),
+                 pf.post_add_new_pet_no_photo(key, 'Матюся', 'британец', '9'),
+                 pf.post_add_photo_pet(key, 'id', PHOTO), pf.update_pet_info(key, 'id', 'Матюсище', 'двортерьер', 6),
+                 pf.delete_pet(key, 'id')]
+        for status, result in calls:
+            assert status == 503
+            assert 'Application Error' in result
+        assert server.stats['error_page'] == len(calls)
+
+
+@pytest.mark.parametrize('fault', ['reset', 'truncate'])
+def test_connection_faults(stub, fault):
+    """Сброс соединения и обрыв тела на середине видны клиенту как ошибка requests"""
+    with proxy(stub, **{fault: 1.0}) as server:
+        pf = PetFriends(server.url, RequestsTransport(), journal=None)
+        with pytest.raises(requests.RequestException):
+            pf.get_api_key(valid_email, valid_password)
+        assert server.stats[fault] >= 1
+
+
+def test_latency_and_bandwidth(stub):
+    """Задержка добавляется к каждому ответу, тело отдаётся не быстрее bandwidth байт в секунду"""
+    with proxy(stub, latency='0.05') as server:
+        pf = PetFriends(server.url, RequestsTransport(), journal=None)
+        started = time.perf_counter()
+        pf.get_api_key(valid_email, valid_password)
+        assert time.perf_counter() - started >= 0.05
+    with proxy(stub, bandwidth=2000) as server:
+        pf = PetFriends(server.url, RequestsTransport(), journal=None)
+        started = time.perf_counter()
+        status, result = pf.get_api_key(valid_email, '')
+        assert status == 403
+        # Страница 403 заглушки - около 70 байт
+        assert time.perf_counter() - started >= len(result.encode('utf-8')) / 2000 * 0.9
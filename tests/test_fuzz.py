@@ -0,0 +1,54 @@
+from fuzz import Fuzzer, load_corpus
+from settings import valid_email, valid_password
+import pytest
+
+
+def test_fuzzer_minimizes_failure_to_corpus(stub, stub_pf, tmp_path):
+    """Ошибка, заданная оракулом (символ '!' в имени), минимизируется до одного символа и попадает в корпус"""
+    pf = stub_pf()
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    fuzzer = Fuzzer(pf, auth_key, oracle=lambda case, status, result: '!' in case['name'],
+                    workers=4, seed=1, corpus_dir=str(tmp_path))
+    report = fuzzer.run(300)
+    assert report['executed'] == 300
+    assert report['failures']
+    for signature, case in report['failures'].items():
+        assert case['name'] == '!'
+        assert case['animal_type'] == ''
+        assert case['age'] == ''
+    corpus = load_corpus(str(tmp_path))
+    assert len(corpus) == len(report['failures'])
+    assert all(old == new for _, old, new in fuzzer.replay())
+    fuzzer.cleanup()
+    assert stub.pets == {}
+
+
+class ResettingUpdates:
+    """Транспорт, который сбрасывает соединение на каждом обновлении питомца"""
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def request(self, method, url, headers=None, params=None, data=None):
+        if method == 'PUT':
+            raise ConnectionResetError('connection reset by peer')
+        return self.transport.request(method, url, headers=headers, params=params, data=data)
+
+
+def test_transport_errors_are_failures(stub_pf):
+    """Исключение транспорта не прерывает прогон, а становится ошибочным поведением со своей сигнатурой"""
+    pf = stub_pf(wrap=ResettingUpdates)
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    fuzzer = Fuzzer(pf, auth_key, oracle=lambda case, status, result: False, workers=4, seed=1, corpus_dir=None)
+    report = fuzzer.run(50)
+    assert list(report['failures']) == ['update:exc:ConnectionResetError']
+    assert report['failures']['update:exc:ConnectionResetError'] == {'op': 'update', 'name': '', 'animal_type': '',
+                                                                     'age': ''}
+    fuzzer.cleanup()
+
+
+def test_target_pet_error_is_clear(stub_pf):
+    """Если питомца для update_pet_info создать нельзя, ошибка говорит об этом, а не TypeError"""
+    fuzzer = Fuzzer(stub_pf(), {'key': 'ksa344ldld'}, corpus_dir=None)
+    with pytest.raises(RuntimeError, match='update_pet_info: 403'):
+        fuzzer.run(1)
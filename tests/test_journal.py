@@ -0,0 +1,68 @@
+from api import PetFriends
+from journal import PetJournal, collect_garbage
+from petfriends_stub import PetFriendsStub
+from transport import RequestsTransport, WSGITransport
+from settings import valid_email, valid_password
+import os
+import pytest
+
+
+@pytest.fixture()
+def journal(tmp_path):
+    journal = PetJournal(str(tmp_path / 'journal.jsonl'), sync_every=4)
+    yield journal
+    journal.close()
+
+
+def test_garbage_collector_deletes_journaled_pets(journal, stub, stub_pf):
+    """Все созданные через PetFriends питомцы попадают в журнал и удаляются сборщиком"""
+    pf = stub_pf(journal=journal)
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    pets = [pf.add_new_pet_simple(auth_key, 'Матюся', 'британец', str(age))[1]['id'] for age in range(10)]
+    pf.post_add_new_pet_no_photo(auth_key, 'Матюся', 'британец', '9')
+    pf.delete_pet(auth_key, pets[0])
+    assert len(journal.pending()) == 10
+    assert collect_garbage(pf, journal, auth_key) == 10
+    assert stub.pets == {}
+    assert journal.pending() == {}
+
+
+def test_default_journal_with_any_transport(monkeypatch, journal):
+    """Общий журнал ведётся и при явно переданном сетевом транспорте; отключается только journal=None"""
+    monkeypatch.setenv('PETFRIENDS_JOURNAL', journal.path)
+    monkeypatch.setattr('journal._default_journal', journal)
+    assert PetFriends(transport=RequestsTransport()).journal is journal
+    assert PetFriends('http://petfriends.local/', WSGITransport(PetFriendsStub({})), journal=None).journal is None
+
+
+def test_journal_survives_torn_write(journal):
+    """Недописанная при падении строка не мешает прочитать журнал"""
+    journal.created('1', 'key', 'http://petfriends.local/')
+    journal.created('2', 'key', 'http://petfriends.local/')
+    journal.deleted('1')
+    journal.close()
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "created", "id": "3", "ke')
+    assert list(journal.pending('http://petfriends.local/')) == ['2']
+    assert journal.pending('https://petfriends1.herokuapp.com/') == {}
+
+
+def test_live_sessions_keep_their_pets(tmp_path, stub, stub_pf):
+    """Сборщик не трогает питомцев другой живой сессии с тем же журналом, а после её завершения - убирает"""
+    path = str(tmp_path / 'journal.jsonl')
+    ours, theirs = PetJournal(path), PetJournal(path)
+    pf = stub_pf(journal=ours)
+    other = stub_pf(journal=theirs)
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    pf.add_new_pet_simple(auth_key, 'Матюся', 'британец', '9')
+    _, busy = other.add_new_pet_simple(auth_key, 'Матюся', 'британец', '9')
+    assert collect_garbage(pf, ours, auth_key) == 1
+    assert list(stub.pets) == [busy['id']]
+    # Записи живой сессии после compact дописываются в новый файл, а не в удалённый
+    other.add_new_pet_simple(auth_key, 'Матюся', 'британец', '9')
+    assert len(ours.pending()) == 2
+    theirs.close()
+    assert collect_garbage(pf, ours, auth_key) == 2
+    assert stub.pets == {}
+    ours.close()
+    assert os.listdir(path + '.owners') == []
@@ -0,0 +1,48 @@
+from latency import LatencyRecorder, check_budgets, percentile, trim_outliers, Baselines
+from settings import valid_email, valid_password
+import pytest
+
+
+def test_percentile_and_outliers():
+    samples = [0.1] * 18 + [0.2, 5.0]
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([1, 2], 95) == pytest.approx(1.95)
+    kept, dropped = trim_outliers(samples)
+    assert dropped == 2
+    assert max(kept) == 0.1
+
+
+def test_budget_violation_and_baseline_regression(tmp_path):
+    """Превышение бюджета и рост относительно эталона попадают в список проблем"""
+    recorder = LatencyRecorder()
+    for _ in range(20):
+        recorder.record('get_list_of_pets', 1.0)
+    summaries, violations = check_budgets(recorder, {'get_list_of_pets': {'p95': 0.8}, 'delete_pet': {'p95': 1}})
+    assert len(violations) == 2
+    baselines = Baselines(str(tmp_path / 'baselines.json'))
+    baselines.update('t::get_list_of_pets', {'p50': 0.5, 'p95': 0.5, 'p99': 0.5})
+    baselines.save()
+    regressions = Baselines(baselines.path).compare('t::get_list_of_pets', summaries['get_list_of_pets'])
+    assert len(regressions) == 2
+
+
+@pytest.mark.latency_budget(get_list_of_pets={'p95': 0.5}, add_new_pet_simple={'p99': 0.5}, samples=10, warmup=2)
+def test_latency_budget_fixture_in_process(latency_budget, stub_pf):
+    """Фикстура latency_budget замеряет вызовы PetFriends и проверяет бюджеты из маркера"""
+    pf = stub_pf()
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    status, result = latency_budget.measure(pf.get_list_of_pets, auth_key, '')
+    assert status == 200
+    assert len(latency_budget.samples['get_list_of_pets']) == 10
+    # watch записывает каждый вызов метода без повторов
+    latency_budget.watch(pf, ['add_new_pet_simple'])
+    pf.add_new_pet_simple(auth_key, 'Матюся', 'британец', '9')
+    assert len(latency_budget.samples['add_new_pet_simple']) == 1
+
+
+def test_unknown_budget_stat_is_a_usage_error():
+    """Опечатка в маркере (p90 вместо p95) - понятная ошибка, а не KeyError"""
+    recorder = LatencyRecorder()
+    recorder.record('get_list_of_pets', 0.1)
+    with pytest.raises(pytest.UsageError, match="'p90'"):
+        check_budgets(recorder, {'get_list_of_pets': {'p90': 0.8}})
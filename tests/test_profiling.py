@@ -0,0 +1,32 @@
+from profiling import ResourceProfiler, delta, snapshot
+import os
+import tracemalloc
+
+
+def test_snapshot_delta_counts_open_files(tmp_path):
+    """Незакрытый файл и выделенная память видны в разнице снимков"""
+    # Плагин профилирования мог уже включить tracemalloc - тогда не выключаем его
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = snapshot()
+        leaked = open(tmp_path / 'leak.txt', 'w')
+        data = [bytearray(1024) for _ in range(1000)]
+        result = delta(before, snapshot())
+    finally:
+        if started:
+            tracemalloc.stop()
+    leaked.close()
+    if os.path.isdir('/proc/self/fd'):
+        assert result['fds'] == 1
+    assert result['heap'] > 1000 * 1024
+    assert result['top_allocations']
+    assert len(data) == 1000
+
+
+def test_leaks_thresholds():
+    profiler = ResourceProfiler(rss_threshold=1024, fd_threshold=1, socket_threshold=1)
+    profiler.results = {'t::ok': {'rss': 10, 'fds': 0, 'sockets': 0, 'heap': 0, 'top_allocations': []},
+                        't::leak': {'rss': 0, 'fds': 2, 'sockets': 1, 'heap': 0, 'top_allocations': []}}
+    assert profiler.leaks == {'t::leak': ['fds +2', 'sockets +1']}
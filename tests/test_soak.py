@@ -0,0 +1,22 @@
+from soak import SoakRunner, detect_drift
+
+
+def test_soak_runner_in_process(stub, stub_pf):
+    """Короткий soak-прогон на заглушке: статистика по интервалам собрана, питомцы убраны"""
+    pf = stub_pf()
+    report = SoakRunner(pf, duration=0.6, interval=0.2, workers=2, seed=1).run()
+    assert len(report['intervals']) == 3
+    assert all(interval['calls'] > 0 for interval in report['intervals'])
+    assert report['intervals'][0]['error_rate'] == 0
+    assert 'add_new_pet_simple' in report['intervals'][0]['operations']
+    assert stub.pets == {}
+
+
+def test_detect_drift():
+    stable = [{'p95': 0.2, 'error_rate': 0.0, 'rss': 50 * 2 ** 20, 'sockets': 4} for _ in range(6)]
+    assert detect_drift(stable) == []
+    creeping = [{'p95': 0.2 + 0.05 * n, 'error_rate': 0.0, 'rss': (50 + 10 * n) * 2 ** 20, 'sockets': 4 + 2 * n}
+                for n in range(6)]
+    findings = detect_drift(creeping)
+    assert len(findings) == 3
+    assert findings[0].startswith('рост латентности p95')
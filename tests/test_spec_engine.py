@@ -0,0 +1,83 @@
+from spec_engine import ExecutionPlan, compile_spec
+import pytest
+
+# Тесты движка табличных кейсов на PetFriendsStub, без сети
+
+SPEC = {
+    'values': {'long': {'repeat': 'x', 'times': 300}},
+    'cases': [
+        {'id': 'list', 'endpoint': 'get_list_of_pets', 'matrix': {'filter': {'all': '', 'long': '$long'}},
+         'expect': {'status': 200}},
+        {'id': 'add', 'endpoint': 'add_new_pet_simple', 'inputs': {'animal_type': 'британец'},
+         'matrix': {'name': ['Матюся', ''], 'age': {'ok': '9', 'negative': '-1'}},
+         'invalid_when': 'pet_fields_invalid', 'expect': {'status': 200, 'echo': ['name', 'age']},
+         'expect_invalid': {'status': 400}},
+        {'id': 'update', 'endpoint': 'update_pet_info', 'inputs': {'pet_id': '$my_pet', 'name': 'Матюсище',
+                                                                   'animal_type': 'двортерьер', 'age': 6},
+         'expect': {'status': 200, 'fields': {'id': '$pet_id', 'name': 'Матюсище'}}},
+        {'id': 'delete', 'endpoint': 'delete_pet', 'auth': 'invalid', 'inputs': {'pet_id': '$new_pet'},
+         'expect': {'status': 403, 'contains': 'Forbidden'}},
+    ],
+}
+
+
+@pytest.fixture()
+def pf(stub_pf):
+    return stub_pf()
+
+
+def test_compile_spec():
+    """Матрица разворачивается в декартово произведение, $name подставляется, invalid_when выбирает ожидание"""
+    cases = {case.id: case for case in compile_spec(SPEC)}
+    assert len(cases) == 2 + 4 + 1 + 1
+    assert cases['list[long]'].inputs['filter'] == 'x' * 300
+    assert cases['add[Матюся-ok]'].expect['status'] == 200
+    assert cases['add[-ok]'].expect['status'] == 400
+    assert cases['add[Матюся-negative]'].expect['status'] == 400
+    assert cases['delete'].auth == 'invalid'
+
+
+def test_execution_plan(pf):
+    """Кейсы группируются по методу и выполняются пачками; расхождения попадают в check"""
+    plan = ExecutionPlan(compile_spec(SPEC), pf, batch_size=2)
+    assert [case.group for case in plan.cases][:2] == [('get_list_of_pets', 'valid')] * 2
+    assert len(plan.batches['add[Матюся-ok]']) == 2
+    problems = {case.id: plan.check(case) for case in plan.cases}
+    # Заглушка, как и сервер, отвечает 500 на неизвестный фильтр и добавляет питомца с некорректными данными
+    assert problems['list[all]'] == []
+    assert problems['list[long]'] == ['код ответа 500, ожидался 200']
+    assert problems['add[Матюся-ok]'] == []
+    assert problems['add[-ok]'] == ['код ответа 200, ожидался 400']
+    assert problems['update'] == []
+    assert problems['delete'] == []
+    assert len(plan.created) == 2
+    plan.cleanup()
+    _, my_pets = pf.get_list_of_pets(plan.auth_key, 'my_pets')
+    assert plan.created == []
+    # Остались только питомцы из кейсов add - их удаляет сборщик мусора по журналу (см. journal.py)
+    assert len(my_pets['pets']) == 4
+
+
+def test_only_selected_cases_run(pf):
+    """Невыбранные кейсы не попадают в пачки: не выполняются и не создают питомцев"""
+    cases = compile_spec(SPEC)
+    plan = ExecutionPlan(cases, pf)
+    plan.select([case for case in cases if case.id in ('add[Матюся-ok]', 'delete')])
+    assert plan.check(plan.cases[0]) == []
+    assert set(plan.results) == {'add[Матюся-ok]'}
+    assert plan.check(plan.cases[1]) == []
+    assert set(plan.results) == {'add[Матюся-ok]', 'delete'}
+    _, my_pets = pf.get_list_of_pets(plan.auth_key, 'my_pets')
+    # Питомец кейса add и $new_pet кейса delete, других кейсов add не выполнялось
+    assert len(my_pets['pets']) == 2
+
+
+def test_setup_creates_my_pet(pf):
+    """Кейс с предусловием my_pet проходит и на пустом аккаунте, без питомцев от прошлых прогонов"""
+    spec = {'cases': [{'id': 'mine', 'endpoint': 'get_list_of_pets', 'setup': ['my_pet'],
+                       'inputs': {'filter': 'my_pets'}, 'expect': {'status': 200, 'nonempty': 'pets'}}]}
+    plan = ExecutionPlan(compile_spec(spec), pf)
+    assert plan.check(plan.cases[0]) == []
+    plan.cleanup()
+    with pytest.raises(ValueError, match='my_pets'):
+        compile_spec({'cases': [dict(spec['cases'][0], setup=['my_pets'])]})
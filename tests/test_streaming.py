@@ -0,0 +1,86 @@
+from api import PetFriends
+from streaming import generate_stream
+from transport import RequestsTransport
+from settings import valid_email, valid_password
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import threading
+import pytest
+
+
+class ChunkedHandler(BaseHTTPRequestHandler):
+    """Сервер, который вычитывает chunked-тело и отвечает его размером, либо сразу отвечает 413"""
+
+    def do_POST(self):
+        if self.server.reject:
+            self.send_response(413)
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            return
+        size = 0
+        while True:
+            chunk_size = int(self.rfile.readline().split(b';')[0], 16)
+            if chunk_size == 0:
+                self.rfile.readline()
+                break
+            size += len(self.rfile.read(chunk_size))
+            self.rfile.readline()
+        body = json.dumps({'id': '1', 'received': size,
+                           'chunked': self.headers.get('Transfer-Encoding') == 'chunked'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ChunkedHandler)
+    server.reject = False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_streaming_fields_sent_chunked(server):
+    """Поле из генератора на 20 МиБ уходит chunked-потоком, статистика отправки заполнена"""
+    pf = PetFriends(f'http://127.0.0.1:{server.server_port}/', RequestsTransport(), journal=None)
+    status, result = pf.add_new_pet_simple({'key': 'k'}, generate_stream(20 * 2 ** 20), 'британец', '9')
+    assert status == 200
+    assert result['chunked'] is True
+    assert result['received'] == pf.last_upload.bytes_sent > 20 * 2 ** 20
+    assert pf.last_upload.completed
+    assert pf.last_upload.throughput > 0
+
+
+def test_server_abort_is_timed(server):
+    """Если сервер обрывает загрузку, в статистике есть, после скольких байт и секунд это случилось"""
+    server.reject = True
+    pf = PetFriends(f'http://127.0.0.1:{server.server_port}/', RequestsTransport(), journal=None)
+    status, _ = pf.add_new_pet_simple({'key': 'k'}, generate_stream(512 * 2 ** 20), 'британец', '9')
+    assert status == 413
+    stats = pf.last_upload
+    assert stats.completed is False
+    assert stats.error.startswith('ответ 413')
+    assert stats.as_dict()['aborted_after_bytes'] < 512 * 2 ** 20
+    assert stats.as_dict()['aborted_after_seconds'] is not None
+
+
+def test_streaming_bodies_match_regular_encoding(stub_pf):
+    """Потоковые тела разбираются сервером так же, как обычные (файл и генератор в полях)"""
+    pf = stub_pf()
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    status, pet = pf.add_new_pet_simple(auth_key, io.BytesIO('Матюся'.encode()), 'британец', (c for c in ['1', '0']))
+    assert status == 200
+    assert (pet['name'], pet['age']) == ('Матюся', '10')
+    status, pet = pf.update_pet_info(auth_key, pet['id'], io.StringIO('Мат & юсище'), 'двор=терьер', 6)
+    assert status == 200
+    assert (pet['name'], pet['animal_type'], pet['age']) == ('Мат & юсище', 'двор=терьер', '6')
+    assert pf.last_upload.completed
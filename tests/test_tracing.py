@@ -0,0 +1,85 @@
+from tracing import TraceSink, TracingTransport, normalize_endpoint, FIELDS
+from settings import valid_email, valid_password
+import csv
+import json
+import time
+import pytest
+
+
+def test_normalize_endpoint():
+    assert normalize_endpoint('https://petfriends1.herokuapp.com/api/pets?filter=my_pets') == 'api/pets'
+    assert normalize_endpoint('http://h/api/pets/set_photo/0a1b2c3d4e5f60718293a4b5c6d7e8f9') == \
+           'api/pets/set_photo/{id}'
+
+
+def test_trace_every_call_to_jsonl(tmp_path, stub_pf):
+    """Каждый вызов PetFriends попадает в JSONL с эндпоинтом, кодом ответа, размерами и id теста"""
+    sink = TraceSink(str(tmp_path / 'trace.jsonl'), batch_size=4)
+    pf = stub_pf(wrap=lambda transport: TracingTransport(transport, sink))
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    _, pet = pf.add_new_pet_simple(auth_key, 'Матюся', 'британец', '9')
+    pf.get_list_of_pets(auth_key, 'my_pets')
+    pf.delete_pet(auth_key, pet['id'])
+    pf.get_list_of_pets({'key': 'ksa344ldld'}, '')
+    sink.close()
+    with open(sink.path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [(r['method'], r['endpoint'], r['status']) for r in records] == [
+        ('GET', 'api/key', 200), ('POST', 'api/create_pet_simple', 200), ('GET', 'api/pets', 200),
+        ('DELETE', 'api/pets/{id}', 200), ('GET', 'api/pets', 403)]
+    assert all(r['test_id'].endswith('test_trace_every_call_to_jsonl') for r in records)
+    assert records[2]['wire_bytes'] < records[2]['content_bytes']
+    assert records[2]['params_hash'] != records[4]['params_hash']
+
+
+def test_ring_buffer_drops_oldest_when_full(tmp_path):
+    sink = TraceSink(str(tmp_path / 'trace.csv'), capacity=10, batch_size=100, flush_interval=60)
+    for n in range(25):
+        sink.record(tuple([n] + [None] * (len(FIELDS) - 1)))
+    sink.close()
+    with open(sink.path, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(FIELDS)
+    assert [row[0] for row in rows[1:]] == [str(n) for n in range(15, 25)]
+    assert sink.dropped == 15
+
+
+def test_flush_thread_survives_write_errors(tmp_path, monkeypatch):
+    """Ошибка записи пачки учитывается в failed, а фоновый поток продолжает сбрасывать буфер"""
+    sink = TraceSink(str(tmp_path / 'trace.jsonl'), batch_size=1, flush_interval=0.01)
+    write = sink._write
+    calls = []
+
+    def flaky_write(batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise OSError('No space left on device')
+        write(batch)
+
+    monkeypatch.setattr(sink, '_write', flaky_write)
+    sink.record(tuple([0] + [None] * (len(FIELDS) - 1)))
+    for _ in range(100):
+        if sink.failed:
+            break
+        time.sleep(0.01)
+    sink.record(tuple([1] + [None] * (len(FIELDS) - 1)))
+    for _ in range(100):
+        if sink.written:
+            break
+        time.sleep(0.01)
+    assert sink._thread.is_alive()
+    sink.close()
+    assert (sink.failed, sink.written) == (1, 1)
+
+
+def test_parquet_schema_is_fixed(tmp_path):
+    """Пачка, где все запросы упали (status и размеры - None), не ломает схему Parquet"""
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    sink = TraceSink(str(tmp_path / 'trace.parquet'), batch_size=1, flush_interval=3600)
+    failed = (0.0, 'GET', 'api/key', 'h', None, 0, None, None, 1.0, '', 'ConnectionError', True)
+    sink.record(failed)
+    sink.flush()
+    sink.record((1.0, 'GET', 'api/key', 'h', 200, 0, 10, 10, 1.0, '', '', False))
+    sink.close()
+    assert sink.failed == 0
+    assert pyarrow_parquet.read_table(sink.path).column('status').to_pylist() == [None, 200]
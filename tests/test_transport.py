@@ -0,0 +1,114 @@
+from api import PetFriends
+from faultproxy import FaultProxy
+from transport import WSGITransport, ASGITransport, HttpxTransport, Urllib3Transport, get_transport
+from settings import valid_email, valid_password
+import importlib.util
+import os
+import pytest
+
+# Тесты API через транспорт без сети: запросы PetFriends передаются напрямую в PetFriendsStub
+
+
+@pytest.fixture()
+def pf(stub_pf):
+    return stub_pf()
+
+
+def test_get_api_key_in_process(pf):
+    """Позитивный и негативный тест получения API ключа через WSGITransport"""
+    status, result = pf.get_api_key(valid_email, valid_password)
+    assert status == 200
+    assert 'key' in result
+    status, result = pf.get_api_key(valid_email, '')
+    assert status == 403
+    assert 'Forbidden' in result
+
+
+def test_pet_crud_in_process(pf, pet_photo='images/cat11.jpg'):
+    """Проходим полный цикл: добавление, фото, обновление, список своих питомцев и удаление"""
+    pet_photo = os.path.join(os.path.dirname(__file__), pet_photo)
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    status, pet = pf.add_new_pet_simple(auth_key, 'Матюся', 'британец', '9')
+    assert status == 200
+    assert pet['name'] == 'Матюся'
+    status, result = pf.post_add_photo_pet(auth_key, pet['id'], pet_photo)
+    assert status == 200
+    assert result['pet_photo'].startswith('data:image/jpeg;base64,')
+    status, result = pf.update_pet_info(auth_key, pet['id'], 'Матюсище', 'двортерьер', 6)
+    assert status == 200
+    assert result['age'] == '6'
+    _, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
+    assert [p['id'] for p in my_pets['pets']] == [pet['id']]
+    status, result = pf.delete_pet(auth_key, pet['id'])
+    assert status == 200
+    assert result == ''
+    _, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
+    assert my_pets['pets'] == []
+
+
+def test_negative_filter_and_key_in_process(pf):
+    """Неизвестный фильтр даёт 500, неверный ключ - 403 с текстом Forbidden (текст вместо JSON)"""
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    status, _ = pf.get_list_of_pets(auth_key, 'чужие')
+    assert status == 500
+    status, result = pf.get_list_of_pets({'key': 'ksa344ldld'}, '')
+    assert status == 403
+    assert 'Forbidden' in result
+
+
+def test_asgi_transport():
+    """ASGITransport передаёт запрос в ASGI-приложение и собирает ответ"""
+    async def app(scope, receive, send):
+        message = await receive()
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body',
+                    'body': ('{"path": "%s", "body": "%s"}' % (scope['path'], message['body'].decode())).encode()})
+
+    res = ASGITransport(app).request('POST', 'http://petfriends.local/api/pets', data={'name': 'x'})
+    assert res.status_code == 200
+    assert res.json() == {'path': '/api/pets', 'body': 'name=x'}
+
+
+@pytest.fixture()
+def stub_server(stub):
+    """Настоящий HTTP-сервер на 127.0.0.1 с PetFriendsStub за ним (прокси без сбоев) - для сетевых транспортов"""
+    with FaultProxy('http://petfriends.local/', transport=WSGITransport(stub)) as server:
+        yield server
+
+
+# httpx - необязательная зависимость
+NETWORK_TRANSPORTS = [Urllib3Transport,
+                      pytest.param(HttpxTransport, marks=pytest.mark.skipif(importlib.util.find_spec('httpx') is None,
+                                                                            reason='не установлен httpx'))]
+
+
+@pytest.mark.parametrize('transport_class', NETWORK_TRANSPORTS)
+def test_network_transport_against_stub(stub_server, transport_class, pet_photo='images/cat11.jpg'):
+    """Сетевой транспорт через локальный сервер: ключ, питомец с фото (multipart), фильтр, ошибки и удаление"""
+    transport = transport_class()
+    pf = PetFriends(stub_server.url, transport, journal=None)
+    try:
+        status, result = pf.get_api_key(valid_email, '')
+        assert status == 403
+        _, auth_key = pf.get_api_key(valid_email, valid_password)
+        status, pet = pf.add_new_pet_with_photo(auth_key, 'Матюся', 'британец', '9',
+                                                os.path.join(os.path.dirname(__file__), pet_photo))
+        assert status == 200
+        assert pet['pet_photo'].startswith('data:image/jpeg;base64,')
+        status, my_pets = pf.get_list_of_pets(auth_key, 'my_pets')
+        assert status == 200
+        assert [p['id'] for p in my_pets['pets']] == [pet['id']]
+        status, result = pf.delete_pet(auth_key, pet['id'])
+        assert status == 200
+        assert result == ''
+        res = transport.request('GET', stub_server.url + 'api/pets', headers={'auth_key': 'ksa344ldld'})
+        assert res.status_code == 403
+        assert res.wire_size > 0
+    finally:
+        transport.close()
+
+
+def test_get_transport_unknown_name():
+    with pytest.raises(ValueError):
+        get_transport('carrier-pigeon')
@@ -0,0 +1,76 @@
+from latency import LatencyRecorder, check_budgets
+from settings import valid_email, valid_password
+import warmup
+
+# Тесты прогрева на PetFriendsStub, без сети. У каждого теста свой хост, чтобы состояние прогрева не пересекалось
+
+
+class SleepingDyno:
+    """Транспорт, который первые sleeps запросов отвечает 503, как просыпающийся dyno Heroku"""
+
+    def __init__(self, transport, sleeps: int):
+        self.transport = transport
+        self.sleeps = sleeps
+        self.requests = 0
+
+    def request(self, method, url, headers=None, params=None, data=None):
+        self.requests += 1
+        if self.sleeps:
+            self.sleeps -= 1
+            return type('Response', (), {'status_code': 503})()
+        return self.transport.request(method, url, headers=headers, params=params, data=data)
+
+
+def test_warmup_wakes_backend_and_fetches_key(monkeypatch, stub_pf):
+    """Прогрев повторяет запрос, пока сервер отвечает 5xx, открывает соединения и получает ключ"""
+    monkeypatch.setattr(warmup.time, 'sleep', lambda seconds: None)
+    pf = stub_pf('dyno.local', wrap=lambda transport: SleepingDyno(transport, sleeps=2))
+    transport = pf.transport
+    assert warmup.is_cold(pf.base_url)
+    result = warmup.Warmup(pf, connections=3).start()
+    assert result.wait(5)
+    assert result.error == ''
+    assert 'key' in result.auth_key
+    # 2 ответа 503, пробуждение, 3 соединения и ключ
+    assert transport.requests == 2 + 1 + 3 + 1
+    assert not warmup.is_cold(pf.base_url + 'api/pets')
+    assert warmup.is_cold(pf.base_url, idle_timeout=-1)
+
+
+def test_warmup_error_and_session_key(monkeypatch, stub_pf):
+    """Ошибка прогрева сохраняется, а не бросается; ключ сессии отдаётся только для того же бэкенда"""
+    monkeypatch.setattr(warmup.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(warmup, '_session', None)
+    failed = warmup.Warmup(stub_pf('broken.local'), credentials=(valid_email, 'wrong')).run()
+    assert 'ключ API' in failed.error
+    assert 'не удался' in str(failed)
+    pf = stub_pf('session.local')
+    session = warmup.start_session_warmup(pf)
+    assert warmup.session_auth_key(stub_pf('session.local')) == session.auth_key
+    assert warmup.session_auth_key(stub_pf('other.local')) is None
+    assert warmup.session_auth_key(pf, (valid_email, 'other')) is None
+
+
+def test_session_key_wait_is_bounded(monkeypatch, stub_pf):
+    """Зависший прогрев не держит тесты: после таймаута ключа нет, и его получают обычным запросом"""
+    pf = stub_pf('stuck.local')
+    monkeypatch.setattr(warmup, '_session', warmup.Warmup(pf))
+    assert warmup.session_auth_key(pf, timeout=0.01) is None
+
+
+def test_cold_samples_are_tagged_separately(stub_pf):
+    """Прогревочные вызовы и первый вызов к непрогретому бэкенду попадают в cold_samples, а не в бюджет"""
+    pf = stub_pf('recorder.local')
+    recorder = LatencyRecorder(samples=5, warmup=2)
+    _, auth_key = pf.get_api_key(valid_email, valid_password)
+    recorder.measure(pf.get_list_of_pets, auth_key, '')
+    assert len(recorder.cold_samples['get_list_of_pets']) == 2
+    assert len(recorder.samples['get_list_of_pets']) == 5
+    pf = recorder.watch(stub_pf('watched.local'))
+    for _ in range(3):
+        pf.get_api_key(valid_email, valid_password)
+    assert len(recorder.cold_samples['get_api_key']) == 1
+    assert len(recorder.samples['get_api_key']) == 2
+    summaries, violations = check_budgets(recorder, {'get_list_of_pets': {'p95': 1}})
+    assert violations == []
+    assert summaries['get_list_of_pets']['cold']['count'] == 2
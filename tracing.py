@@ -0,0 +1,205 @@
+import atexit
+import collections
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from warmup import is_cold, touch
+
+# Поля записи трассировки, в порядке хранения в кортеже
+FIELDS = ('ts', 'method', 'endpoint', 'params_hash', 'status', 'request_bytes', 'wire_bytes', 'content_bytes',
+          'duration_ms', 'test_id', 'error', 'cold')
+
+# Типы полей в Parquet, по порядку FIELDS. Схема задаётся явно: если вывести её из пачки, где все
+# запросы упали (status и wire_bytes - только None), получится тип null и следующая пачка не запишется
+PARQUET_TYPES = ('float64', 'string', 'string', 'string', 'int64', 'int64', 'int64', 'int64', 'float64', 'string',
+                 'string', 'bool_')
+
+log = logging.getLogger(__name__)
+
+_ID_RE = re.compile(r'/[0-9a-fA-F-]{16,}(?=/|$)')
+
+
+def normalize_endpoint(url: str) -> str:
+    """Путь запроса без схемы и хоста, с заменой id питомцев на {id}: api/pets/{id}"""
+    path = url.split('://', 1)[-1].split('/', 1)[-1]
+    return _ID_RE.sub('/{id}', '/' + path.split('?', 1)[0])[1:]
+
+
+def params_hash(params, data) -> str:
+    """Короткий хэш параметров и полей запроса. Содержимое файлов не читается - вместо него имя файла"""
+    items = []
+    for source in (params or {}, data if isinstance(data, dict) else getattr(data, 'fields', None) or {}):
+        for name, value in sorted(source.items()):
+            items.append(f'{name}={value[0] if isinstance(value, tuple) else value}')
+    return hashlib.blake2b('&'.join(items).encode('utf-8', 'replace'), digest_size=8).hexdigest()
+
+
+def request_size(data) -> int:
+    if data is None:
+        return 0
+    if hasattr(data, 'stats'):
+        return data.stats.bytes_sent
+    if hasattr(data, 'len'):
+        return data.len
+    if isinstance(data, dict):
+        return sum(len(str(k)) + len(str(v)) + 2 for k, v in data.items())
+    return len(data) if hasattr(data, '__len__') else 0
+
+
+class TraceSink:
+    """Кольцевой буфер записей трассировки в памяти, который фоновый поток сбрасывает пачками
+    в файл JSONL, CSV или Parquet (нужен pyarrow). Запись в буфер - одно append в deque без
+    блокировок, так что трассировка почти не замедляет вызовы. При переполнении буфера (диск не
+    успевает) старые записи вытесняются и учитываются в dropped, записи пачек, которые не удалось
+    записать, - в failed"""
+
+    def __init__(self, path: str, fmt: str = None, capacity: int = 65536, batch_size: int = 1024,
+                 flush_interval: float = 1.0):
+        self.path = path
+        self.fmt = fmt or os.path.splitext(path)[1].lstrip('.') or 'jsonl'
+        if self.fmt not in ('jsonl', 'csv', 'parquet'):
+            raise ValueError(f'Неизвестный формат трассировки {self.fmt!r}: jsonl, csv или parquet')
+        if self.fmt == 'parquet':
+            try:
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError('Для трассировки в Parquet необходима библиотека pyarrow: pip install pyarrow')
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self._buffer = collections.deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._stopped = False
+        self._writer = None
+        self._file = None
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='trace-sink', daemon=True)
+        self._thread.start()
+
+    def record(self, record: tuple):
+        if len(self._buffer) == self.capacity:
+            self.dropped += 1
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Поток записи не должен умирать из-за одной пачки (диск переполнен, ошибка схемы и т.п.)
+                log.exception('Не удалось записать трассировку в %s', self.path)
+
+    def flush(self):
+        with self._flush_lock:
+            while self._buffer:
+                batch = []
+                try:
+                    for _ in range(self.batch_size):
+                        batch.append(self._buffer.popleft())
+                except IndexError:
+                    pass
+                try:
+                    self._write(batch)
+                except Exception:
+                    self.failed += len(batch)
+                    raise
+
+    def _write(self, batch: list):
+        if self.fmt == 'parquet':
+            import pyarrow
+            import pyarrow.parquet
+            schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind in zip(FIELDS, PARQUET_TYPES)])
+            table = pyarrow.table({name: [r[i] for r in batch] for i, name in enumerate(FIELDS)}, schema=schema)
+            if self._writer is None:
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            if self._file is None:
+                new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+                self._file = open(self.path, 'a', encoding='utf-8', newline='')
+                if self.fmt == 'csv':
+                    import csv
+                    self._writer = csv.writer(self._file)
+                    if new_file:
+                        self._writer.writerow(FIELDS)
+            if self.fmt == 'csv':
+                self._writer.writerows(batch)
+            else:
+                self._file.write(''.join(json.dumps(dict(zip(FIELDS, r)), ensure_ascii=False) + '\n'
+                                         for r in batch))
+            self._file.flush()
+        self.written += len(batch)
+
+    def close(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        with self._flush_lock:
+            if self.fmt == 'parquet' and self._writer is not None:
+                self._writer.close()
+            if self._file is not None:
+                self._file.close()
+            self._writer = self._file = None
+
+
+class TracingTransport:
+    """Обёртка над любым транспортом: записывает каждый запрос PetFriends в TraceSink.
+    Идентификатор теста берётся из переменной PYTEST_CURRENT_TEST, которую выставляет pytest.
+    cold - запрос ушёл к ещё не прогретому бэкенду (см. warmup.is_cold)"""
+
+    def __init__(self, transport, sink: TraceSink):
+        self.transport = transport
+        self.sink = sink
+
+    def request(self, method: str, url: str, headers: dict = None, params: dict = None, data=None):
+        ts = time.time()
+        started = time.perf_counter()
+        status, wire, content, error = None, None, None, ''
+        cold = is_cold(url)
+        try:
+            res = self.transport.request(method, url, headers=headers, params=params, data=data)
+            status, content = res.status_code, len(res.content)
+            wire = getattr(res, 'wire_size', content)
+            touch(url)
+            return res
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            test_id = os.environ.get('PYTEST_CURRENT_TEST', '').rsplit(' ', 1)[0]
+            self.sink.record((ts, method, normalize_endpoint(url), params_hash(params, data), status,
+                              request_size(data), wire, content, (time.perf_counter() - started) * 1000,
+                              test_id, error, cold))
+
+    def __getattr__(self, name):
+        # session, pool и прочие атрибуты обёрнутого транспорта остаются доступны
+        return getattr(self.transport, name)
+
+    def close(self):
+        self.transport.close()
+
+
+_sinks = {}
+
+
+def trace_sink(path: str) -> TraceSink:
+    """Общий на процесс TraceSink для файла path, закрывается при выходе из процесса"""
+    if path not in _sinks:
+        _sinks[path] = TraceSink(path)
+        atexit.register(_sinks[path].close)
+    return _sinks[path]
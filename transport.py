@@ -0,0 +1,265 @@
+import asyncio
+import io
+import json
+import os
+import threading
+from urllib.parse import urlencode, urlsplit, unquote
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from compression import decode_content
+
+
+class Response:
+    """Ответ транспорта в том же виде, что и requests.Response: status_code, headers, content,
+    text и json(). Используется транспортами, которые не возвращают requests.Response.
+    wire_size - размер тела на проводе (до распаковки), content - распакованное тело"""
+
+    def __init__(self, status_code: int, headers, content: bytes, wire_size: int = None):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.wire_size = len(content) if wire_size is None else wire_size
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        # Ошибка разбора - json.decoder.JSONDecodeError, как и у requests, поэтому методы
+        # PetFriends обрабатывают ответы любого транспорта одинаково
+        return json.loads(self.text)
+
+
+def is_stream(data) -> bool:
+    """Тело-итератор блоков без известной длины (streaming.py) - отправляется с Transfer-Encoding: chunked"""
+    return hasattr(data, '__iter__') and not isinstance(data, (bytes, bytearray, str, dict, list, tuple))
+
+
+def encode_body(headers: dict, data) -> bytes:
+    """Приводит тело запроса к байтам: словарь кодируется как форма (как это делает requests),
+    файлоподобные объекты (например MultipartEncoder) вычитываются целиком"""
+    if data is None:
+        return b''
+    if isinstance(data, dict):
+        headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+        return urlencode(data).encode('utf-8')
+    if hasattr(data, 'read'):
+        data = data.read()
+    elif is_stream(data):
+        data = b''.join(data)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return data
+
+
+def decoded_response(status_code: int, headers, raw: bytes) -> Response:
+    """Собирает Response из тела "как на проводе", распаковывая его по заголовку Content-Encoding"""
+    headers = CaseInsensitiveDict(headers)
+    content = decode_content(raw, headers.get('Content-Encoding', ''))
+    return Response(status_code, headers, content, wire_size=len(raw))
+
+
+def build_url(url: str, params: dict = None) -> str:
+    if not params:
+        return url
+    return url + ('&' if '?' in url else '?') + urlencode(params)
+
+
+class RequestsTransport:
+    """Транспорт по умолчанию - requests с общей сессией (пул соединений keep-alive)"""
+
+    def __init__(self, session: requests.Session = None):
+        self.session = session or requests.Session()
+
+    def request(self, method: str, url: str, headers: dict = None, params: dict = None, data=None):
+        res = self.session.request(method, url, headers=headers, params=params, data=data)
+        # urllib3 считает байты, прочитанные из сокета, то есть размер ещё сжатого тела
+        res.wire_size = res.raw.tell() if hasattr(res.raw, 'tell') else len(res.content)
+        return res
+
+    def close(self):
+        self.session.close()
+
+
+class Urllib3Transport:
+    """Транспорт на "сыром" пуле соединений urllib3 без накладных расходов requests"""
+
+    def __init__(self, maxsize: int = 10, **pool_kwargs):
+        import urllib3
+        self.pool = urllib3.PoolManager(maxsize=maxsize, **pool_kwargs)
+
+    def request(self, method: str, url: str, headers: dict = None, params: dict = None, data=None):
+        headers = dict(headers or {})
+        if is_stream(data):
+            res = self.pool.request(method, build_url(url, params), body=iter(data), headers=headers,
+                                    chunked=True, redirect=False)
+            return Response(res.status, res.headers, res.data, wire_size=res.tell())
+        body = encode_body(headers, data)
+        res = self.pool.request(method, build_url(url, params), body=body or None, headers=headers,
+                                redirect=False)
+        return Response(res.status, res.headers, res.data, wire_size=res.tell())
+
+    def close(self):
+        self.pool.clear()
+
+
+class HttpxTransport:
+    """Транспорт на httpx. С http2=True запросы мультиплексируются в одном соединении
+    (нужен пакет httpx[http2])"""
+
+    def __init__(self, http2: bool = False, **client_kwargs):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError('Для HttpxTransport необходима библиотека httpx: pip install httpx[http2]')
+        self.client = httpx.Client(http2=http2, **client_kwargs)
+
+    def request(self, method: str, url: str, headers: dict = None, params: dict = None, data=None):
+        headers = dict(headers or {})
+        body = iter(data) if is_stream(data) else encode_body(headers, data)
+        res = self.client.request(method, url, headers=headers, params=params, content=body)
+        res.wire_size = res.num_bytes_downloaded
+        return res
+
+    def close(self):
+        self.client.close()
+
+
+class WSGITransport:
+    """Транспорт без сети: запрос передаётся напрямую в WSGI-приложение в том же процессе"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method: str, url: str, headers: dict = None, params: dict = None, data=None):
+        headers = dict(headers or {})
+        body = encode_body(headers, data)
+        parts = urlsplit(build_url(url, params))
+        environ = {
+            'REQUEST_METHOD': method.upper(),
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote(parts.path),
+            'QUERY_STRING': parts.query,
+            'SERVER_NAME': parts.hostname or 'localhost',
+            'SERVER_PORT': str(parts.port or (443 if parts.scheme == 'https' else 80)),
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': parts.scheme or 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers.items():
+            key = name.upper().replace('-', '_')
+            if key == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            else:
+                environ['HTTP_' + key] = str(value)
+
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = response_headers
+
+        chunks = self.app(environ, start_response)
+        try:
+            content = b''.join(chunks)
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        return decoded_response(started['status'], started['headers'], content)
+
+    def close(self):
+        pass
+
+
+class ASGITransport:
+    """Транспорт без сети для ASGI-приложений: каждый запрос выполняется в отдельном цикле событий"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method: str, url: str, headers: dict = None, params: dict = None, data=None):
+        headers = dict(headers or {})
+        body = encode_body(headers, data)
+        parts = urlsplit(build_url(url, params))
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method.upper(),
+            'scheme': parts.scheme or 'http',
+            'path': unquote(parts.path),
+            'raw_path': parts.path.encode('latin-1'),
+            'query_string': parts.query.encode('latin-1'),
+            'root_path': '',
+            'headers': [(k.lower().encode('latin-1'), str(v).encode('utf-8')) for k, v in headers.items()],
+            'server': (parts.hostname or 'localhost', parts.port or 80),
+        }
+        received = {'sent': False}
+        result = {'status': 500, 'headers': [], 'body': []}
+
+        async def receive():
+            if received['sent']:
+                return {'type': 'http.disconnect'}
+            received['sent'] = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                result['status'] = message['status']
+                result['headers'] = [(k.decode('latin-1'), v.decode('latin-1'))
+                                     for k, v in message.get('headers', [])]
+            elif message['type'] == 'http.response.body':
+                result['body'].append(message.get('body', b''))
+
+        asyncio.run(self.app(scope, receive, send))
+        return decoded_response(result['status'], result['headers'], b''.join(result['body']))
+
+    def close(self):
+        pass
+
+
+# Транспорты, которые можно выбрать по имени (например через переменную окружения PETFRIENDS_TRANSPORT)
+TRANSPORTS = {
+    'requests': RequestsTransport,
+    'urllib3': Urllib3Transport,
+    'httpx': HttpxTransport,
+}
+
+
+def get_transport(name: str = None):
+    """Возвращает сетевой транспорт по имени. Если имя не задано, берётся из переменной
+    окружения PETFRIENDS_TRANSPORT, по умолчанию - requests. Если задана переменная
+    PETFRIENDS_TRACE (путь к .jsonl, .csv или .parquet), все запросы трассируются в этот файл"""
+    name = name or os.environ.get('PETFRIENDS_TRANSPORT', 'requests')
+    try:
+        transport = TRANSPORTS[name]()
+    except KeyError:
+        raise ValueError(f'Неизвестный транспорт {name!r}, доступны: {", ".join(TRANSPORTS)}')
+    trace_path = os.environ.get('PETFRIENDS_TRACE')
+    if trace_path:
+        from tracing import TracingTransport, trace_sink
+        transport = TracingTransport(transport, trace_sink(trace_path))
+    return transport
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_transport(name: str = None):
+    """Общий на процесс транспорт (как get_transport): все клиенты PetFriends без явного транспорта
+    используют один пул соединений, так что соединения, открытые при прогреве (warmup.py), и
+    keep-alive переиспользуются между тестами вместо нового TCP/TLS рукопожатия в каждом модуле"""
+    key = (name or os.environ.get('PETFRIENDS_TRANSPORT', 'requests'), os.environ.get('PETFRIENDS_TRACE'))
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = get_transport(name)
+        return _shared[key]
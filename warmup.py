@@ -0,0 +1,141 @@
+"""Прогрев бэкенда PetFriends перед тестами и учёт "холодных" замеров.
+
+Бэкенд живёт на Heroku: dyno засыпает без запросов, и первый запрос после сна ждёт его запуска
+несколько секунд. Warmup будит сервер, открывает соединения в общем пуле транспорта и заранее
+получает ключ API - в фоновом потоке, как только pytest выбрал тесты, которым нужна сеть (маркер
+network, см. tests/conftest.py).
+is_cold и touch отмечают, прогрет ли бэкенд, чтобы замеры латентности (latency.py, tracing.py)
+делились на холодные и тёплые.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from settings import valid_email, valid_password
+
+# Dyno Heroku засыпает после 30 минут без запросов
+IDLE_TIMEOUT = 30 * 60
+
+_last_seen = {}
+_lock = threading.Lock()
+_session = None
+
+
+def backend(url: str) -> str:
+    """Схема и хост адреса: все запросы к одному бэкенду разделяют его состояние прогрева"""
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+def touch(url: str):
+    """Отмечает, что бэкенд только что ответил и, значит, не спит"""
+    with _lock:
+        _last_seen[backend(url)] = time.monotonic()
+
+
+def is_cold(url: str, idle_timeout: float = IDLE_TIMEOUT) -> bool:
+    """Холодный бэкенд: в этом процессе он ещё не отвечал или молчал дольше idle_timeout секунд"""
+    last = _last_seen.get(backend(url))
+    return last is None or time.monotonic() - last > idle_timeout
+
+
+class Warmup:
+    """Прогрев бэкенда клиента pf: wake - будит сервер, connect - открывает connections соединений
+    параллельно, чтобы они остались в пуле транспорта, fetch_key - получает ключ API. Ошибки прогрева
+    не роняют тесты, а сохраняются в error"""
+
+    def __init__(self, pf, credentials: tuple = (valid_email, valid_password), connections: int = 4,
+                 deadline: float = 90.0, attempts: int = 3):
+        self.pf = pf
+        self.credentials = credentials
+        self.connections = connections
+        self.deadline = deadline
+        self.attempts = attempts
+        self.auth_key = None
+        self.wake_time = None
+        self.duration = None
+        self.error = ''
+        self._done = threading.Event()
+
+    def _ping(self) -> int:
+        return self.pf.transport.request('GET', self.pf.base_url).status_code
+
+    def wake(self):
+        """Запрашивает главную страницу, пока сервер отвечает 5xx (dyno ещё запускается). Сетевые
+        ошибки повторяются не больше attempts раз: спящий dyno соединение принимает"""
+        started = time.perf_counter()
+        failures = 0
+        while True:
+            try:
+                if self._ping() < 500:
+                    break
+            except Exception:
+                failures += 1
+                if failures >= self.attempts:
+                    raise
+            if time.perf_counter() - started > self.deadline:
+                raise TimeoutError(f'бэкенд {backend(self.pf.base_url)} не проснулся за {self.deadline:.0f} с')
+            time.sleep(1)
+        self.wake_time = time.perf_counter() - started
+        touch(self.pf.base_url)
+
+    def connect(self):
+        with ThreadPoolExecutor(max_workers=self.connections) as pool:
+            list(pool.map(lambda _: self._ping(), range(self.connections)))
+
+    def fetch_key(self):
+        status, key = self.pf.get_api_key(*self.credentials)
+        if status != 200:
+            raise RuntimeError(f'не удалось получить ключ API: {status}')
+        self.auth_key = key
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            self.wake()
+            self.connect()
+            self.fetch_key()
+        except Exception as e:
+            self.error = f'{type(e).__name__}: {e}'
+        finally:
+            self.duration = time.perf_counter() - started
+            self._done.set()
+        return self
+
+    def start(self):
+        threading.Thread(target=self.run, name='petfriends-warmup', daemon=True).start()
+        return self
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def __str__(self):
+        if not self._done.is_set():
+            return f'прогрев {backend(self.pf.base_url)} не завершён'
+        if self.error:
+            return f'прогрев {backend(self.pf.base_url)} не удался за {self.duration:.1f} с: {self.error}'
+        return (f'прогрев {backend(self.pf.base_url)}: сервер ответил через {self.wake_time:.1f} с, '
+                f'открыто соединений {self.connections}, всего {self.duration:.1f} с')
+
+
+def start_session_warmup(pf, **kwargs) -> Warmup:
+    """Запускает прогрев в фоне и делает его прогревом сессии (см. session_auth_key)"""
+    global _session
+    _session = Warmup(pf, **kwargs).start()
+    return _session
+
+
+def session_warmup():
+    return _session
+
+
+def session_auth_key(pf, credentials: tuple = (valid_email, valid_password), timeout: float = 15.0):
+    """Ключ API, полученный прогревом сессии для того же бэкенда и пользователя, или None.
+    Если прогрев ещё идёт - ждёт его не дольше timeout секунд, после чего ключ стоит получить самому"""
+    warmup = _session
+    if warmup is None or backend(warmup.pf.base_url) != backend(pf.base_url) or warmup.credentials != credentials:
+        return None
+    if not warmup.wait(timeout):
+        return None
+    return warmup.auth_key